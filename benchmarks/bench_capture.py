@@ -0,0 +1,205 @@
+"""Benchmark der Capture-Pfade von ScreenshotTool.take_screenshot
+
+Usage:
+    python benchmarks/bench_capture.py                      # run and compare against baseline.json
+    python benchmarks/bench_capture.py --update-baseline    # store the results as new baseline
+    python benchmarks/bench_capture.py --layouts 4k --contents text,noisy -n 10
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic
+
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+STAGES = ("lookup", "grab", "encode", "write")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "mean": sum(samples) / len(samples) if samples else 0.0,
+    }
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def bench_scenario(main, layout, content, iterations, workdir):
+    """Miss jede Stufe von take_screenshot einzeln und den Durchsatz am Stück"""
+    backend = synthetic.SyntheticBackend(layout, content)
+    backend.install(main)
+    try:
+        tool = main.ScreenshotTool()
+        encoder = main.get_encoder(tool.settings["encoder"])
+        profile = tool.settings["encoder_profile"]
+        options = tool.settings["encoder_options"]
+        # The app's own write path: temp file and rename, group commit, catalog insert
+        store = tool.get_store()
+
+        timings = {stage: [] for stage in STAGES}
+        sizes = []
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            monitor = tool.get_mouse_monitor()
+            t1 = time.perf_counter()
+            bbox = (monitor.x, monitor.y, monitor.x + monitor.width, monitor.y + monitor.height)
+            image = tool.get_backend().grab(bbox)
+            t2 = time.perf_counter()
+            buffer = io.BytesIO()
+            encoder.save(image, buffer, profile, options)
+            t3 = time.perf_counter()
+            frame = main.Frame(image, monitor=main.monitor_info(monitor), name=f"{layout}_{content}")
+            store.save(frame, buffer.getbuffer(), encoder.name, encoder.extension)
+            t4 = time.perf_counter()
+
+            timings["lookup"].append(t1 - t0)
+            timings["grab"].append(t2 - t1)
+            timings["encode"].append(t3 - t2)
+            timings["write"].append(t4 - t3)
+            sizes.append(buffer.getbuffer().nbytes)
+        # Pending group commits would otherwise land in the throughput run
+        store.writer.flush()
+
+        # End to end through the real take_screenshot and the worker pipeline
+        start = time.perf_counter()
+        for _ in range(iterations):
+            tool.take_screenshot()
+        tool.get_pipeline().flush()
+        elapsed = time.perf_counter() - start
+    finally:
+        backend.uninstall()
+
+    return {
+        "stages": {stage: summarize(samples) for stage, samples in timings.items()},
+        "throughput_shots_per_s": iterations / elapsed if elapsed else 0.0,
+        "mean_bytes": sum(sizes) / len(sizes),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_isolated(layout, content, iterations, workdir):
+    """Führe ein Szenario in einem eigenen Prozess aus, damit dessen Peak-RSS nur ihm gehört"""
+    # ru_maxrss never goes down, in one process every scenario would report the largest so far
+    result_file = os.path.join(workdir, f"result_{layout}_{content}.json")
+    subprocess.run([sys.executable, os.path.abspath(__file__), "--scenario", f"{layout}/{content}",
+                    "-n", str(iterations), "--workdir", workdir, "--result-file", result_file],
+                   cwd=workdir, check=True)
+    with open(result_file, "r") as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance):
+    """Liefere eine Liste der Regressionen gegenüber der Baseline"""
+    regressions = []
+    for name, result in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        for stage in STAGES:
+            now = result["stages"][stage]["p50"]
+            before = base["stages"][stage]["p50"]
+            # Sub-millisecond stages are dominated by noise
+            if before > 0.001 and now > before * tolerance:
+                regressions.append(f"{name} {stage}: p50 {before * 1000:.2f} ms -> {now * 1000:.2f} ms")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark the screenshot capture path")
+    parser.add_argument("-n", "--iterations", type=int, default=5)
+    parser.add_argument("--layouts", default=",".join(synthetic.LAYOUTS))
+    parser.add_argument("--contents", default=",".join(synthetic.CONTENTS))
+    parser.add_argument("--encoder", default=None, help="override the encoder setting")
+    parser.add_argument("--profile", default=None, help="override the encoder_profile setting")
+    parser.add_argument("--output", default=None, help="write results as JSON to this file")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed p50 slowdown factor")
+    # Internal: run a single scenario in a child process
+    parser.add_argument("--scenario", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        os.chdir(args.workdir)
+        layout, content = args.scenario.split("/")
+        result = bench_scenario(synthetic.load_main(), layout, content, args.iterations, args.workdir)
+        with open(args.result_file, "w") as f:
+            json.dump(result, f)
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix="pyssutil_bench_")
+    os.chdir(workdir)
+    settings = {"screenshot_path": os.path.join(workdir, "screenshots"), "logs_path": os.path.join(workdir, "logs"),
+                # Synthetic frames repeat, dedup would turn the throughput run into a hash benchmark
+                "dedup": "off", "capture_backend": "imagegrab"}
+    if args.encoder:
+        settings["encoder"] = args.encoder
+    if args.profile:
+        settings["encoder_profile"] = args.profile
+    with open("settings.json", "w") as f:
+        json.dump(settings, f)
+
+    results = {
+        "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "iterations": args.iterations,
+        "scenarios": {},
+    }
+    for layout in args.layouts.split(","):
+        for content in args.contents.split(","):
+            name = f"{layout}/{content}"
+            result = run_isolated(layout, content, args.iterations, workdir)
+            results["scenarios"][name] = result
+            stages = "  ".join(f"{s} {result['stages'][s]['p50'] * 1000:8.2f}" for s in STAGES)
+            print(f"{name:16} {stages}  ms p50  {result['throughput_shots_per_s']:6.2f} shots/s  "
+                  f"{result['mean_bytes'] / 1024:8.0f} KiB  {result['peak_rss_mb']:6.0f} MB RSS")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found, run with --update-baseline first")
+        return 0
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,73 @@
+"""Startzeit-Budget für main.py
+
+Runs `main.py --profile-startup` several times in a scratch directory and fails
+when the median time to hotkeys-ready exceeds the budget.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --budget-ms 400
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN = os.path.join(os.path.dirname(BENCH_DIR), "main.py")
+
+# Median budgets in milliseconds, measured from the first line of main.py
+STARTUP_BUDGET_MS = 500
+PHASE_BUDGETS_MS = {
+    "imports": 300,
+    "settings": 50,
+    "hotkeys": 100,
+}
+
+
+def profile_once(workdir):
+    output = os.path.join(workdir, "profile.json")
+    env = dict(os.environ, pyscreenshotutil_config=os.path.join(workdir, "settings.json"))
+    subprocess.run(
+        [sys.executable, MAIN, "--profile-startup", "--profile-output", output],
+        cwd=workdir, env=env, check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=60
+    )
+    with open(output, "r") as f:
+        return json.load(f)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Check main.py startup time against a budget")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="pyssutil_startup_")
+    # The first run writes the default settings, it is not representative
+    profile_once(workdir)
+    profiles = [profile_once(workdir) for _ in range(args.runs)]
+
+    failures = []
+    phases = {name: [p["phases"].get(name, 0.0) * 1000 for p in profiles] for name in profiles[0]["phases"]}
+    for name, samples in phases.items():
+        median = statistics.median(samples)
+        budget = PHASE_BUDGETS_MS.get(name)
+        print(f"{name:16} {median:8.1f} ms" + (f"  (budget {budget} ms)" if budget else ""))
+        if budget and median > budget:
+            failures.append(f"{name}: {median:.1f} ms > {budget} ms")
+
+    total = statistics.median(p["total"] * 1000 for p in profiles)
+    print(f"{'total':16} {total:8.1f} ms  (budget {args.budget_ms:.0f} ms)")
+    if total > args.budget_ms:
+        failures.append(f"total: {total:.1f} ms > {args.budget_ms:.0f} ms")
+
+    for failure in failures:
+        print(f"OVER BUDGET {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,241 @@
+import io
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+from PIL import Image, ImageGrab
+
+logger = logging.getLogger("PySSUtil")
+
+DEFAULT_BACKEND = "imagegrab"
+
+
+class CaptureBackend:
+    """Liefert Bilder vom Bildschirm; ScreenshotTool kennt nur diese Schnittstelle"""
+    name = None
+    # True if grab_region() reads only its box. Otherwise every grab copies all screens and
+    # crops, and a strip capture would cost one full desktop per strip
+    region_grab = False
+    # Bytes per pixel that one grab_region() allocates at its peak
+    region_bytes_per_pixel = 4
+
+    def cursor_position(self):
+        """(x, y) des Mauszeigers oder None, wenn das Backend ihn nicht kennt"""
+        import pyautogui
+        return pyautogui.position()
+
+    def grab(self, bbox=None):
+        """Bild des Bereichs (left, top, right, bottom), None für alle Bildschirme"""
+        raise NotImplementedError
+
+    def grab_region(self, bbox):
+        """Nur den Bereich bbox vom Bildschirm lesen (Streifen-Modus, nur mit region_grab)"""
+        return self.grab(bbox)
+
+    def select_region(self):
+        """Vom Benutzer gewählter Bereich oder None (nicht jedes Backend kann das)"""
+        return None
+
+    def copy_to_clipboard(self, image):
+        """Kopiere ein Bild in die Zwischenablage; False, wenn nicht unterstützt"""
+        return False
+
+
+class ImageGrabBackend(CaptureBackend):
+    """Pillow-ImageGrab (Windows, macOS und X11)"""
+    name = "imagegrab"
+    # ImageGrab grabs every screen and crops on Windows and X11; on Windows grab_region()
+    # uses BitBlt on the box instead. X11 and macOS (Retina scaling) have no region path
+    region_grab = sys.platform == "win32"
+    # The DIB section plus the decoded RGB image (which Pillow keeps at 4 bytes per pixel)
+    region_bytes_per_pixel = 8
+
+    def grab(self, bbox=None):
+        return ImageGrab.grab(bbox=bbox, all_screens=True)
+
+    def grab_region(self, bbox):
+        if sys.platform != "win32":
+            return self.grab(bbox)
+        return _gdi_grab(bbox)
+
+
+class GrimBackend(CaptureBackend):
+    """grim/slurp unter Wayland (wlroots, z.B. Hyprland und Sway)"""
+    name = "grim"
+    # grim -g copies only the region; the PPM from stdout plus the decoded image
+    region_grab = True
+    region_bytes_per_pixel = 7
+
+    def cursor_position(self):
+        # pyautogui cannot see the pointer under Wayland, Hyprland can tell us
+        if shutil.which("hyprctl") is None:
+            return None
+        try:
+            output = subprocess.run(["hyprctl", "cursorpos"], capture_output=True, text=True, check=True).stdout
+            x, y = output.split(",")
+            return int(x), int(y)
+        except (subprocess.CalledProcessError, ValueError):
+            return None
+
+    def grab(self, bbox=None):
+        cmd = ["grim", "-t", "ppm"]  # uncompressed, the encoder runs on the pipeline anyway
+        if bbox is not None:
+            left, top, right, bottom = bbox
+            cmd += ["-g", f"{left},{top} {right - left}x{bottom - top}"]
+        data = subprocess.run(cmd + ["-"], stdout=subprocess.PIPE, check=True).stdout
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+
+    def select_region(self):
+        result = subprocess.run(["slurp", "-f", "%x %y %w %h"], capture_output=True, text=True)
+        if result.returncode != 0 or not result.stdout.strip():
+            # Selection canceled
+            return None
+        x, y, w, h = (int(value) for value in result.stdout.split())
+        return (x, y, x + w, y + h)
+
+    def copy_to_clipboard(self, image):
+        if shutil.which("wl-copy") is None:
+            return False
+        buffer = io.BytesIO()
+        image.save(buffer, "PNG", compress_level=1)
+        subprocess.run(["wl-copy", "--type", "image/png"], input=buffer.getbuffer(), check=True)
+        return True
+
+
+class FakeBackend(CaptureBackend):
+    """Einfarbige Bilder ohne Bildschirm, für Tests und Headless-Läufe"""
+    name = "fake"
+    region_grab = True
+
+    def __init__(self, size=(1920, 1080), cursor=(0, 0)):
+        self.size = size
+        self.cursor = cursor
+        self.grabs = 0
+        self.clipboard = None
+        self.lock = threading.Lock()
+
+    def cursor_position(self):
+        return self.cursor
+
+    def grab(self, bbox=None):
+        with self.lock:
+            self.grabs += 1
+            count = self.grabs
+        size = self.size if bbox is None else (bbox[2] - bbox[0], bbox[3] - bbox[1])
+        # A different colour per grab, so deduplication does not swallow them
+        return Image.new("RGB", size, (count % 256, (count // 256) % 256, 128))
+
+    def select_region(self):
+        return (0, 0, self.size[0], self.size[1])
+
+    def copy_to_clipboard(self, image):
+        self.clipboard = image
+        return True
+
+
+_gdi = None
+
+
+def _gdi_functions():
+    global _gdi
+    if _gdi is None:
+        import ctypes
+        from ctypes import wintypes
+        user32, gdi32 = ctypes.WinDLL("user32"), ctypes.WinDLL("gdi32")
+        # Handles are pointer sized, the ctypes default (int) would truncate them on 64 bit
+        user32.GetDC.argtypes = [wintypes.HWND]
+        user32.GetDC.restype = wintypes.HDC
+        user32.ReleaseDC.argtypes = [wintypes.HWND, wintypes.HDC]
+        gdi32.CreateCompatibleDC.argtypes = [wintypes.HDC]
+        gdi32.CreateCompatibleDC.restype = wintypes.HDC
+        gdi32.CreateCompatibleBitmap.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int]
+        gdi32.CreateCompatibleBitmap.restype = wintypes.HBITMAP
+        gdi32.SelectObject.argtypes = [wintypes.HDC, wintypes.HGDIOBJ]
+        gdi32.SelectObject.restype = wintypes.HGDIOBJ
+        gdi32.BitBlt.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                 wintypes.HDC, ctypes.c_int, ctypes.c_int, wintypes.DWORD]
+        gdi32.GetDIBits.argtypes = [wintypes.HDC, wintypes.HBITMAP, wintypes.UINT, wintypes.UINT,
+                                    ctypes.c_void_p, ctypes.c_void_p, wintypes.UINT]
+        gdi32.DeleteObject.argtypes = [wintypes.HGDIOBJ]
+        gdi32.DeleteDC.argtypes = [wintypes.HDC]
+        set_awareness = getattr(user32, "SetThreadDpiAwarenessContext", None)  # Windows 10 1607+
+        if set_awareness is not None:
+            set_awareness.argtypes = [ctypes.c_void_p]
+            set_awareness.restype = ctypes.c_void_p
+        _gdi = (ctypes, wintypes, user32, gdi32)
+    return _gdi
+
+
+def _gdi_grab(bbox):
+    """Kopiere nur bbox per BitBlt vom Bildschirm (Windows, virtuelle Desktop-Koordinaten)"""
+    ctypes, wintypes, user32, gdi32 = _gdi_functions()
+    SRCCOPY, CAPTUREBLT, DIB_RGB_COLORS = 0x00CC0020, 0x40000000, 0
+
+    class BITMAPINFOHEADER(ctypes.Structure):
+        _fields_ = [("biSize", wintypes.DWORD), ("biWidth", wintypes.LONG), ("biHeight", wintypes.LONG),
+                    ("biPlanes", wintypes.WORD), ("biBitCount", wintypes.WORD), ("biCompression", wintypes.DWORD),
+                    ("biSizeImage", wintypes.DWORD), ("biXPelsPerMeter", wintypes.LONG),
+                    ("biYPelsPerMeter", wintypes.LONG), ("biClrUsed", wintypes.DWORD), ("biClrImportant", wintypes.DWORD)]
+
+    left, top, right, bottom = bbox
+    width, height = right - left, bottom - top
+    # Physical pixels like Pillow's own grab, so the box matches the monitor geometry
+    set_awareness = getattr(user32, "SetThreadDpiAwarenessContext", None)
+    previous_awareness = set_awareness(ctypes.c_void_p(-3)) if set_awareness else None
+    screen = user32.GetDC(None)
+    memory = gdi32.CreateCompatibleDC(screen)
+    bitmap = gdi32.CreateCompatibleBitmap(screen, width, height)
+    try:
+        previous = gdi32.SelectObject(memory, bitmap)
+        copied = gdi32.BitBlt(memory, 0, 0, width, height, screen, left, top, SRCCOPY | CAPTUREBLT)
+        gdi32.SelectObject(memory, previous)
+        if not copied:
+            raise OSError(f"BitBlt failed for {bbox}")
+        # Negative height: top-down rows, 32 bit BGRX
+        header = BITMAPINFOHEADER(ctypes.sizeof(BITMAPINFOHEADER), width, -height, 1, 32, 0, 0, 0, 0, 0, 0)
+        buffer = ctypes.create_string_buffer(width * height * 4)
+        if not gdi32.GetDIBits(memory, bitmap, 0, height, buffer, ctypes.byref(header), DIB_RGB_COLORS):
+            raise OSError(f"GetDIBits failed for {bbox}")
+    finally:
+        gdi32.DeleteObject(bitmap)
+        gdi32.DeleteDC(memory)
+        user32.ReleaseDC(None, screen)
+        if set_awareness and previous_awareness:
+            set_awareness(previous_awareness)
+    return Image.frombuffer("RGB", (width, height), buffer, "raw", "BGRX", 0, 1)
+
+
+BACKENDS = {}
+
+
+def register_backend(backend_class):
+    BACKENDS[backend_class.name] = backend_class
+    return backend_class
+
+
+register_backend(ImageGrabBackend)
+register_backend(GrimBackend)
+register_backend(FakeBackend)
+
+
+def detect_backend():
+    """grim unter Wayland, sonst ImageGrab"""
+    if sys.platform.startswith("linux") and os.environ.get("WAYLAND_DISPLAY") and shutil.which("grim"):
+        return GrimBackend.name
+    return DEFAULT_BACKEND
+
+
+def get_backend(name="auto"):
+    """Erzeuge ein Capture-Backend aus der Registry (ImageGrab als Fallback)"""
+    if name == "auto":
+        name = detect_backend()
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        logger.warning(f"Unknown capture backend '{name}', using '{DEFAULT_BACKEND}'")
+        return BACKENDS[DEFAULT_BACKEND]()
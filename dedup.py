@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger("PySSUtil")
+
+DEDUP_OFF = "off"
+DEDUP_EXACT = "exact"
+DEDUP_PERCEPTUAL = "perceptual"
+DEDUP_MODES = (DEDUP_OFF, DEDUP_EXACT, DEDUP_PERCEPTUAL)
+
+DHASH_SIZE = 8          # 8x8 gradient bits -> 64 bit perceptual hash
+DHASH_REDUCE = 8        # reduce() factor before resizing, keeps dHash cheap on 4K frames
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dedup (
+    digest TEXT PRIMARY KEY,
+    dhash INTEGER,
+    path TEXT NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dedup_last_seen ON dedup (last_seen);
+"""
+
+
+def frame_digest(image):
+    """Exakter Hash über die rohen Pixel (vor dem Kodieren)"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def dhash(image, size=DHASH_SIZE):
+    """Perzeptueller Differenz-Hash: vergleicht benachbarte Pixel eines Miniaturbilds"""
+    factor = min(DHASH_REDUCE, image.size[0] // (size + 1), image.size[1] // size)
+    small = image.reduce(factor) if factor > 1 else image
+    pixels = list(small.convert("L").resize((size + 1, size)).getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    # SQLite integers are signed 64 bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hamming(a, b):
+    return ((a ^ b) & 0xFFFFFFFFFFFFFFFF).bit_count()
+
+
+class DedupIndex:
+    """Begrenzter LRU-Index Hash -> gespeicherte Datei, im Katalog persistiert"""
+
+    def __init__(self, db, db_lock, mode=DEDUP_EXACT, threshold=4, max_entries=4096):
+        if mode not in DEDUP_MODES:
+            logger.warning(f"Unknown dedup mode '{mode}', using '{DEDUP_EXACT}'")
+            mode = DEDUP_EXACT
+        self.db = db
+        self.db_lock = db_lock
+        self.mode = mode
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.entries = OrderedDict()  # digest -> (dhash, relative path), oldest first
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        with self.db_lock:
+            self.db.executescript(SCHEMA)
+            # Only the newest entries are kept, on disk as in memory
+            self.db.execute(
+                "DELETE FROM dedup WHERE digest NOT IN "
+                "(SELECT digest FROM dedup ORDER BY last_seen DESC LIMIT ?)", (self.max_entries,)
+            )
+            self.db.commit()
+            rows = self.db.execute("SELECT digest, dhash, path FROM dedup ORDER BY last_seen").fetchall()
+        for digest, value, path in rows:
+            self.entries[digest] = (value, path)
+
+    @property
+    def enabled(self):
+        return self.mode != DEDUP_OFF
+
+    def fingerprint(self, image):
+        """(exakter Hash, dHash oder None) eines Frames"""
+        value = dhash(image) if self.mode == DEDUP_PERCEPTUAL else None
+        return frame_digest(image), value
+
+    def lookup(self, fingerprint):
+        """Relativer Pfad eines schon gespeicherten gleichen (oder fast gleichen) Frames"""
+        digest, value = fingerprint
+        with self.lock:
+            match = digest if digest in self.entries else None
+            if match is None and value is not None:
+                # Linear scan, the index is small and popcount is cheap
+                for candidate, (other, _) in self.entries.items():
+                    if other is not None and hamming(value, other) <= self.threshold:
+                        match = candidate
+                        break
+            if match is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(match)
+            self.hits += 1
+            path = self.entries[match][1]
+        with self.db_lock:
+            self.db.execute("UPDATE dedup SET last_seen = ? WHERE digest = ?", (time.time(), match))
+        return path
+
+    def add(self, fingerprint, path):
+        """Merke den Hash einer neu gespeicherten Datei (Aufrufer hält db_lock und committet)"""
+        digest, value = fingerprint
+        with self.lock:
+            self.entries[digest] = (value, path)
+            self.entries.move_to_end(digest)
+            evicted = []
+            while len(self.entries) > self.max_entries:
+                evicted.append(self.entries.popitem(last=False)[0])
+        self.db.execute(
+            "INSERT OR REPLACE INTO dedup (digest, dhash, path, last_seen) VALUES (?, ?, ?, ?)",
+            (digest, value, path, time.time())
+        )
+        if evicted:
+            self.db.executemany("DELETE FROM dedup WHERE digest = ?", [(d,) for d in evicted])
+
+    def forget(self, paths):
+        """Entferne Einträge, deren Dateien gelöscht wurden"""
+        paths = set(paths)
+        with self.lock:
+            stale = [digest for digest, (_, other) in self.entries.items() if other in paths]
+            for digest in stale:
+                del self.entries[digest]
+        if stale:
+            with self.db_lock:
+                self.db.executemany("DELETE FROM dedup WHERE digest = ?", [(d,) for d in stale])
+                self.db.commit()
+
+    def stats(self):
+        return {"mode": self.mode, "entries": len(self.entries), "hits": self.hits, "misses": self.misses}
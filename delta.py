@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime
+
+from PIL import Image, ImageChops
+
+logger = logging.getLogger("PySSUtil")
+
+DELTA_EXTENSION = ".tdelta"
+MAGIC = b"TDLT\x01"
+RECORD = struct.Struct("<cdII")   # kind, captured_at (unix time), changed tiles, payload bytes
+TILE_INDEX = struct.Struct("<I")
+KEYFRAME = b"K"
+DELTA = b"D"
+COMPRESS_LEVEL = 1
+
+DELTA_OFF = "off"
+DELTA_TIMELAPSE = "timelapse"
+DELTA_ALL = "all"
+DELTA_MODES = (DELTA_OFF, DELTA_TIMELAPSE, DELTA_ALL)
+
+# A delta frame is stored in the catalog as "<segment>#<frame index>"
+FRAME_SEPARATOR = "#"
+
+
+class TileGrid:
+    """Feste Kacheln über einem Bild"""
+
+    def __init__(self, width, height, tile):
+        self.width = width
+        self.height = height
+        self.tile = tile
+        self.columns = (width + tile - 1) // tile
+        self.rows = (height + tile - 1) // tile
+
+    def __len__(self):
+        return self.columns * self.rows
+
+    def box(self, index):
+        row, column = divmod(index, self.columns)
+        left, top = column * self.tile, row * self.tile
+        return left, top, min(left + self.tile, self.width), min(top + self.tile, self.height)
+
+    def changed(self, previous, image):
+        """Indizes der Kacheln, in denen sich mindestens ein Pixel unterscheidet"""
+        difference = ImageChops.difference(previous, image)
+        bbox = difference.getbbox()
+        if bbox is None:
+            return []
+        # Only tiles inside the bounding box of all changes need a closer look
+        first_column, first_row = bbox[0] // self.tile, bbox[1] // self.tile
+        last_column, last_row = (bbox[2] - 1) // self.tile, (bbox[3] - 1) // self.tile
+        changed = []
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                index = row * self.columns + column
+                if difference.crop(self.box(index)).getbbox() is not None:
+                    changed.append(index)
+        return changed
+
+
+def _header(mode, width, height, tile):
+    header = json.dumps({"mode": mode, "width": width, "height": height, "tile": tile}).encode()
+    return MAGIC + TILE_INDEX.pack(len(header)) + header
+
+
+class DeltaSegment:
+    """Ein Segment: Keyframe plus geänderte Kacheln der folgenden Frames, nur angehängt"""
+
+    def __init__(self, path, image, tile):
+        self.path = path
+        self.mode = image.mode
+        self.size = image.size
+        self.grid = TileGrid(image.size[0], image.size[1], tile)
+        self.previous = None
+        self.frames = 0
+        with open(path, "wb") as f:
+            f.write(_header(self.mode, self.size[0], self.size[1], tile))
+
+    def matches(self, image):
+        return image.mode == self.mode and image.size == self.size
+
+    def append(self, image, captured_at):
+        """Hänge ein Frame an; liefert (Frame-Index, geschriebene Bytes)"""
+        if self.previous is None:
+            kind, count, payload = KEYFRAME, len(self.grid), zlib.compress(image.tobytes(), COMPRESS_LEVEL)
+        else:
+            changed = self.grid.changed(self.previous, image)
+            parts = []
+            for index in changed:
+                parts.append(TILE_INDEX.pack(index))
+                parts.append(image.crop(self.grid.box(index)).tobytes())
+            kind, count, payload = DELTA, len(changed), zlib.compress(b"".join(parts), COMPRESS_LEVEL)
+        # Frames are not modified after capture, so keeping a reference is enough
+        self.previous = image
+        record = RECORD.pack(kind, captured_at.timestamp(), count, len(payload))
+        with open(self.path, "ab") as f:
+            f.write(record)
+            f.write(payload)
+        index = self.frames
+        self.frames += 1
+        return index, len(record) + len(payload)
+
+
+class DeltaStore:
+    """Schreibt wiederholte Aufnahmen pro Monitor als Kachel-Deltas statt als volle Bilder"""
+
+    def __init__(self, store, mode=DELTA_TIMELAPSE, tile=64, keyframe_interval=100):
+        if mode not in DELTA_MODES:
+            logger.warning(f"Unknown delta mode '{mode}', using '{DELTA_OFF}'")
+            mode = DELTA_OFF
+        self.store = store
+        self.mode = mode
+        self.tile = max(8, int(tile))
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.segments = {}        # stream -> DeltaSegment
+        self.locks = {}           # stream -> lock, frames of one stream must be appended in turn
+        self.lock = threading.Lock()
+        self.frames = 0
+        self.keyframes = 0
+        self.bytes_written = 0
+
+    def accepts(self, frame):
+        if self.mode == DELTA_ALL:
+            return True
+        return self.mode == DELTA_TIMELAPSE and frame.name == "timelapse"
+
+    def stream_for(self, frame):
+        monitor = (frame.monitor or {}).get("name") or "desktop"
+        return f"{frame.name or 'screenshot'}_{monitor}"
+
+    def save(self, frame):
+        """Speichere ein Frame; liefert den Katalog-Pfad "<Segment>#<Index>" und die Bytes"""
+        stream = self.stream_for(frame)
+        with self.lock:
+            stream_lock = self.locks.setdefault(stream, threading.Lock())
+        with stream_lock:
+            segment = self.segments.get(stream)
+            if segment is None or segment.frames >= self.keyframe_interval or not segment.matches(frame.image):
+                shard, path = self.store.path_for(frame, DELTA_EXTENSION)
+                self.store.ensure_dir(shard)
+                segment = DeltaSegment(path, frame.image, self.tile)
+                self.segments[stream] = segment
+                self.keyframes += 1
+            index, size_bytes = segment.append(frame.image, frame.captured_at)
+        self.frames += 1
+        self.bytes_written += size_bytes
+        return f"{segment.path}{FRAME_SEPARATOR}{index}", size_bytes
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "frames": self.frames,
+            "keyframes": self.keyframes,
+            "bytes": self.bytes_written,
+            "streams": len(self.segments),
+        }
+
+
+class DeltaReader:
+    """Liest ein Segment und rekonstruiert beliebige Frames daraus"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a delta segment")
+            (length,) = TILE_INDEX.unpack(f.read(TILE_INDEX.size))
+            header = json.loads(f.read(length))
+            self.mode = header["mode"]
+            self.size = (header["width"], header["height"])
+            self.tile = header["tile"]
+            # Only the record headers are read, payloads are skipped until a frame is requested
+            self.records = []
+            while True:
+                raw = f.read(RECORD.size)
+                if len(raw) < RECORD.size:
+                    break
+                kind, captured_at, count, length = RECORD.unpack(raw)
+                offset = f.tell()
+                if offset + length > os.fstat(f.fileno()).st_size:
+                    # Torn last record of a crashed writer
+                    break
+                self.records.append((kind, captured_at, count, offset, length))
+                f.seek(length, os.SEEK_CUR)
+        self.grid = TileGrid(self.size[0], self.size[1], self.tile)
+        self.pixel_bytes = len(Image.new(self.mode, (1, 1)).tobytes())
+
+    def __len__(self):
+        return len(self.records)
+
+    def timestamps(self):
+        return [datetime.fromtimestamp(record[1]) for record in self.records]
+
+    def frame(self, index):
+        """Rekonstruiere Frame index: Keyframe plus alle Deltas bis dahin"""
+        if not 0 <= index < len(self.records):
+            raise IndexError(f"frame {index} out of range (0-{len(self.records) - 1})")
+        for position, image in enumerate(self._images(index + 1)):
+            if position == index:
+                return image.copy()
+
+    def __iter__(self):
+        # Applies each delta once instead of replaying from the keyframe for every frame
+        for image in self._images(len(self.records)):
+            yield image.copy()
+
+    def _images(self, count):
+        """Das Bild nach jedem der ersten count Frames (dasselbe Bild, fortgeschrieben)"""
+        image = None
+        with open(self.path, "rb") as f:
+            for kind, _, tiles, offset, length in self.records[:count]:
+                f.seek(offset)
+                payload = zlib.decompress(f.read(length))
+                if kind == KEYFRAME:
+                    image = Image.frombytes(self.mode, self.size, payload)
+                else:
+                    position = 0
+                    for _ in range(tiles):
+                        (index,) = TILE_INDEX.unpack_from(payload, position)
+                        position += TILE_INDEX.size
+                        box = self.grid.box(index)
+                        tile_size = (box[2] - box[0], box[3] - box[1])
+                        end = position + tile_size[0] * tile_size[1] * self.pixel_bytes
+                        image.paste(Image.frombytes(self.mode, tile_size, payload[position:end]), box[:2])
+                        position = end
+                yield image
+
+
+def read_frame(path):
+    """Lies ein Frame über seinen Katalog-Pfad ("<Segment>#<Index>")"""
+    segment, _, index = path.rpartition(FRAME_SEPARATOR)
+    return DeltaReader(segment).frame(int(index))
+
+
+def export_segment(path, output_dir=None):
+    """Schreibe jedes Frame eines Segments als PNG; liefert die Pfade"""
+    output_dir = output_dir or os.path.splitext(path)[0]
+    os.makedirs(output_dir, exist_ok=True)
+    reader = DeltaReader(path)
+    written = []
+    for index, (image, captured_at) in enumerate(zip(reader, reader.timestamps())):
+        target = os.path.join(output_dir, f"{index:05d}_{captured_at.strftime('%Y-%m-%d_%H-%M-%S-%f')}.png")
+        image.save(target, "PNG")
+        written.append(target)
+    return written
@@ -0,0 +1,84 @@
+import logging
+import zlib
+
+logger = logging.getLogger("PySSUtil")
+
+PROFILES = ("fastest", "balanced", "smallest")
+DEFAULT_ENCODER = "png"
+DEFAULT_PROFILE = "balanced"
+
+
+class Encoder:
+    """Ein Ausgabeformat mit benannten Geschwindigkeits-/Größenprofilen"""
+
+    def __init__(self, name, format, extension, profiles, mode="RGB"):
+        self.name = name
+        self.format = format
+        self.extension = extension
+        self.profiles = profiles
+        self.mode = mode
+
+    def options(self, profile=DEFAULT_PROFILE, overrides=None):
+        if profile not in self.profiles:
+            logger.warning(f"Unknown profile '{profile}' for encoder '{self.name}', using '{DEFAULT_PROFILE}'")
+            profile = DEFAULT_PROFILE
+        return {**self.profiles[profile], **(overrides or {})}
+
+    def save(self, image, fp, profile=DEFAULT_PROFILE, overrides=None):
+        """Kodiere das Bild in eine Datei oder ein File-Objekt"""
+        if image.mode != self.mode:
+            image = image.convert(self.mode)
+        image.save(fp, self.format, **self.options(profile, overrides))
+
+
+ENCODERS = {}
+
+
+def register_encoder(encoder):
+    ENCODERS[encoder.name] = encoder
+    return encoder
+
+
+def get_encoder(name):
+    """Hole einen Encoder aus der Registry (PNG als Fallback)"""
+    try:
+        return ENCODERS[name]
+    except KeyError:
+        logger.warning(f"Unknown encoder '{name}', using '{DEFAULT_ENCODER}'")
+        return ENCODERS[DEFAULT_ENCODER]
+
+
+register_encoder(Encoder("png", "PNG", ".png", {
+    # compress_type is the zlib strategy, RLE is much faster on flat UI content
+    "fastest": {"compress_level": 1, "compress_type": zlib.Z_RLE},
+    "balanced": {"compress_level": 6},
+    "smallest": {"compress_level": 9, "optimize": True},
+}))
+
+register_encoder(Encoder("webp", "WEBP", ".webp", {
+    # For lossless WebP, quality is the compression effort
+    "fastest": {"lossless": True, "method": 0, "quality": 0},
+    "balanced": {"lossless": True, "method": 4, "quality": 75},
+    # method 6 with quality 100 is orders of magnitude slower for a few bytes
+    "smallest": {"lossless": True, "method": 6, "quality": 90},
+}))
+
+register_encoder(Encoder("jpeg", "JPEG", ".jpg", {
+    "fastest": {"quality": 85},
+    "balanced": {"quality": 90, "optimize": True},
+    "smallest": {"quality": 75, "optimize": True, "progressive": True},
+}))
+
+# Needs Pillow >= 11.3 for saving
+register_encoder(Encoder("qoi", "QOI", ".qoi", {
+    "fastest": {},
+    "balanced": {},
+    "smallest": {},
+}))
+
+# Uncompressed, for bursts where capture latency matters more than disk space
+register_encoder(Encoder("raw", "BMP", ".bmp", {
+    "fastest": {},
+    "balanced": {},
+    "smallest": {},
+}))
@@ -0,0 +1,277 @@
+import errno
+import hmac
+import json
+import logging
+import os
+import secrets
+import socket
+import sys
+
+logger = logging.getLogger("PySSUtil")
+
+IPC_HOST = "127.0.0.1"
+IPC_PORT = 50555
+
+MAX_BURST = 100
+MAX_LINE = 64 * 1024
+TOKEN_FILE = "ipc.token"
+
+# asyncio is only imported by the server thread, so importing this module stays cheap
+
+# Requests are one line each: either JSON ({"id": 1, "cmd": "capture_burst", "args": [5]})
+# or plain text ("capture_burst 5"). Every request gets exactly one JSON line back, in order.
+# The port is reachable by every local user, so the first line of a connection must be
+# "auth <token>" with the secret from token_path(), which only the owner can read.
+
+
+def token_path():
+    """Pfad der Token-Datei im Profil des Benutzers"""
+    if sys.platform == "win32":
+        # The profile's ACL already keeps other users out
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "PySSUtil", TOKEN_FILE)
+
+
+def create_token(path=None):
+    """Erzeuge ein neues Geheimnis für diese Instanz, nur für den eigenen Benutzer lesbar (0600)"""
+    path = path or token_path()
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    token = secrets.token_hex(32)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    # Created with its final mode, the secret is never readable by others, not even briefly
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(token)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return token
+
+
+def read_token(path=None):
+    """Lies das Geheimnis der laufenden Instanz (FileNotFoundError, wenn es keins gibt)"""
+    with open(path or token_path(), "r") as f:
+        return f.read().strip()
+
+
+def parse_request(line):
+    """Zerlege eine Anfragezeile in (id, Befehl, Argumente)"""
+    line = line.strip()
+    if line.startswith("{"):
+        request = json.loads(line)
+        args = request.get("args", [])
+        if not isinstance(args, list):
+            args = [args]
+        return request.get("id"), str(request.get("cmd", "")), args
+    parts = line.split()
+    if not parts:
+        return None, "", []
+    return None, parts[0], parts[1:]
+
+
+class IPCServer:
+    """Asynchroner IPC-Server mit zeilenbasiertem Request/Response-Protokoll"""
+
+    def __init__(self, tool, host=IPC_HOST, port=IPC_PORT, sock=None, token=None):
+        self.tool = tool
+        self.host = host
+        self.port = port
+        # Already bound listening socket, e.g. the one holding the instance lock
+        self.sock = sock
+        # A new secret per run unless one is given, see token_path()
+        self.token = token
+        self.rejected = 0
+        self.loop = None
+        self.connections = 0
+        self.requests = 0
+        self.commands = {
+            "capture": self.cmd_capture,
+            "capture_burst": self.cmd_capture_burst,
+            "capture_region": self.cmd_capture_region,
+            "status": self.cmd_status,
+            "metrics": self.cmd_metrics,
+            "reload_settings": self.cmd_reload_settings,
+            "find": self.cmd_find,
+            "thumbnail": self.cmd_thumbnail,
+            "open_settings": self.cmd_open_settings,
+            # Sent by older instances on startup
+            "opened_app": self.cmd_open_settings,
+        }
+
+    def serve_forever(self):
+        import asyncio
+        if self.token is None:
+            self.token = create_token()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._serve())
+        finally:
+            self.loop.close()
+
+    async def _serve(self):
+        import asyncio
+        if self.sock is not None:
+            server = await asyncio.start_server(self._handle_connection, sock=self.sock, limit=MAX_LINE)
+        else:
+            server = await asyncio.start_server(self._handle_connection, self.host, self.port, limit=MAX_LINE)
+        logger.info(f"IPC server listening on {self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_connection(self, reader, writer):
+        self.connections += 1
+        authenticated = False
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # StreamReader.readline reports an overlong line as ValueError
+                    await self._respond(writer, {"ok": False, "error": "request too long"})
+                    break
+                if not line:
+                    break
+                if not authenticated:
+                    authenticated = self._authenticate(line.decode(errors="replace"))
+                    if not authenticated:
+                        await self._respond(writer, {"ok": False, "error": "authentication required"})
+                        break
+                    await self._respond(writer, {"ok": True, "result": {"authenticated": True}})
+                    continue
+                # A line without newline at EOF is a legacy single-shot message
+                response = await self._dispatch(line.decode(errors="replace"))
+                if response is not None and not writer.is_closing():
+                    await self._respond(writer, response)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    def _authenticate(self, line):
+        try:
+            _, cmd, args = parse_request(line)
+        except ValueError:
+            cmd, args = "", []
+        if cmd == "auth" and len(args) == 1 and hmac.compare_digest(str(args[0]).encode(), self.token.encode()):
+            return True
+        self.rejected += 1
+        logger.warning("Rejected an IPC connection without a valid token")
+        return False
+
+    async def _respond(self, writer, response):
+        writer.write(json.dumps(response).encode() + b"\n")
+        try:
+            await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+
+    async def _dispatch(self, line):
+        try:
+            request_id, cmd, args = parse_request(line)
+        except ValueError as e:
+            return {"ok": False, "error": f"invalid request: {e}"}
+        if not cmd:
+            return None
+
+        response = {"id": request_id} if request_id is not None else {}
+        handler = self.commands.get(cmd)
+        if handler is None:
+            response.update(ok=False, error=f"unknown command: {cmd}")
+            return response
+
+        self.requests += 1
+        try:
+            # Handlers block (grabbing, file I/O), keep them off the event loop
+            result = await self.loop.run_in_executor(None, handler, *args)
+            response.update(ok=True, result=result)
+        except TypeError as e:
+            response.update(ok=False, error=f"bad arguments for {cmd}: {e}")
+        except Exception as e:
+            logger.error(f"Error handling IPC command {cmd}: {e}")
+            response.update(ok=False, error=str(e))
+        return response
+
+    def cmd_capture(self):
+        self.tool.take_screenshot()
+        return {"queued": 1}
+
+    def cmd_capture_burst(self, count=1):
+        count = int(count)
+        if not 1 <= count <= MAX_BURST:
+            raise ValueError(f"burst size must be between 1 and {MAX_BURST}")
+        for _ in range(count):
+            self.tool.take_screenshot()
+        return {"queued": count}
+
+    def cmd_capture_region(self, copy=False):
+        # The plain text form sends strings
+        return self.tool.capture_region(copy=copy not in (False, "0", "false", "no"))
+
+    def cmd_status(self):
+        status = self.tool.status()
+        status["ipc"] = {"connections": self.connections, "requests": self.requests, "rejected": self.rejected}
+        return status
+
+    def cmd_metrics(self):
+        return self.tool.metrics_report()
+
+    def cmd_reload_settings(self):
+        return {"changed": self.tool.reload_settings()}
+
+    def cmd_find(self, start=None, end=None, monitor=None, limit=100):
+        # "-" skips an argument in the plain text form, e.g. "find - - DISPLAY1"
+        args = [None if value in (None, "-") else value for value in (start, end, monitor, limit)]
+        return self.tool.find_screenshots(*args)
+
+    def cmd_thumbnail(self, path):
+        return {"thumbnail": self.tool.thumbnail_for(path)}
+
+    def cmd_open_settings(self):
+        logger.warning("Opening settings because of external request!")
+        self.tool.open_settings_in_thread()
+        return {"opened": True}
+
+
+def acquire_instance_socket(host=IPC_HOST, port=IPC_PORT):
+    """Binde den IPC-Port als Instanz-Sperre (None, wenn schon eine Instanz läuft)
+
+    The bind is atomic and the OS releases the port when the process dies, so the lock
+    costs the same no matter how many processes run and cannot go stale after a crash.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if sys.platform == "win32":
+        # Without this, Windows lets a second process bind the same port
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+    else:
+        # Still fails while another socket listens, but ignores TIME_WAIT leftovers
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        sock.bind((host, port))
+        sock.listen(socket.SOMAXCONN)
+    except OSError as e:
+        sock.close()
+        if e.errno in (errno.EADDRINUSE, errno.EACCES) or getattr(e, "winerror", None) in (10048, 10013):
+            return None
+        raise
+    return sock
+
+
+def send_command(cmd, *args, host=IPC_HOST, port=IPC_PORT, timeout=10, token=None):
+    """Schicke einen Befehl an die laufende Instanz und liefere die Antwort"""
+    with socket.create_connection((host, port), timeout=timeout) as s:
+        # Read after connecting, so "no instance" stays a ConnectionRefusedError
+        token = read_token() if token is None else token
+        s.sendall(json.dumps({"cmd": "auth", "args": [token]}).encode() + b"\n" +
+                  json.dumps({"cmd": cmd, "args": list(args)}).encode() + b"\n")
+        with s.makefile("rb") as reader:
+            auth = reader.readline()
+            if not auth or not json.loads(auth).get("ok"):
+                return json.loads(auth) if auth else None
+            data = reader.readline()
+    return json.loads(data) if data else None
@@ -5,80 +5,113 @@ import subprocess
 import datetime
 import os
 import pathlib
-import shlex
+import threading
+
+# Sends the capture to a running "main.py --daemon" (same settings, encoder, storage and
+# metrics as on Windows). Without a daemon it falls back to the standalone capture below.
 
 # --- Configuration ---
 SCREENSHOT_DIR = os.path.expanduser("~/Pictures/WaylandScreenshots")
-pathlib.Path(SCREENSHOT_DIR).mkdir(parents=True, exist_ok=True)
-
-# --- Timestamped filename ---
-timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-filename = f"screenshot_{timestamp}.png"
-filepath = os.path.join(SCREENSHOT_DIR, filename)
-
-# --- Take screenshot ---
-try:
-    # Ask user to select area or monitor with slurp
-    print("Select an area or monitor...")
-    area = subprocess.check_output(["slurp"], text=True).strip()  # x,y,w,h
-
-    if area:
-        # Take screenshot of selected area
-        subprocess.run(["grim", "-g", area, filepath], check=True)
-    else:
-        # If slurp canceled, take full screen
-        subprocess.run(["grim", filepath], check=True)
+DAEMON_TIMEOUT = 120  # seconds, includes the time the user spends selecting with slurp
+
+
+def notify(body):
+    # -t sets the timeout (ms); the notification is not waited for
+    try:
+        subprocess.Popen(["notify-send",
+                          "Screenshot Taken",
+                          body,
+                          "-u", "normal",
+                          "-a", "Screenshot Tool",
+                          "-t", "3000",
+                          "-i", "camera-photo",
+                          "-h", "string:x-canonical-private-synchronous:screenshot"])  # prevent stacking multiple
+    except OSError:
+        print("Notification failed!")
+
+
+def capture_with_daemon():
+    """Lass den Daemon aufnehmen; False, wenn keiner läuft"""
+    try:
+        from ipc import send_command
+    except ImportError:
+        # Copied out of the repository (e.g. to ~/.local/bin): no daemon client, capture standalone
+        return False
+    try:
+        response = send_command("capture_region", True, timeout=DAEMON_TIMEOUT)
+    except (ConnectionRefusedError, FileNotFoundError):
+        # FileNotFoundError: no token, the daemon on the port is not ours
+        return False
+    except OSError as e:
+        print("Screenshot failed:", e)
+        exit(1)
+    if not response or not response.get("ok"):
+        print("Screenshot failed:", response.get("error") if response else "no response")
+        exit(1)
+    result = response["result"]
+    print("Screenshot queued by the daemon")
+    if result.get("copied"):
+        print("Copied screenshot to clipboard!")
+    notify("Saved by the screenshot daemon")
+    return True
+
+
+def write_file(path, data, errors):
+    try:
+        with open(path, "wb") as f:
+            f.write(data)
+    except OSError as e:
+        errors.append(e)
+
+
+def capture_standalone():
+    pathlib.Path(SCREENSHOT_DIR).mkdir(parents=True, exist_ok=True)
 
+    # --- Timestamped filename ---
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    filename = f"screenshot_{timestamp}.png"
+    filepath = os.path.join(SCREENSHOT_DIR, filename)
+
+    # --- Take screenshot ---
+    try:
+        # Ask user to select area or monitor with slurp
+        print("Select an area or monitor...")
+        area = subprocess.run(["slurp"], capture_output=True, text=True).stdout.strip()  # x,y,w,h
+
+        # grim writes the PNG to stdout ("-"), so it is read exactly once, into memory
+        # If slurp was canceled, take the full screen
+        grim_cmd = ["grim", "-g", area, "-"] if area else ["grim", "-"]
+        png = subprocess.run(grim_cmd, stdout=subprocess.PIPE, check=True).stdout
+
+    except subprocess.CalledProcessError as e:
+        print("Screenshot failed:", e)
+        exit(1)
+
+    # --- Save and copy to clipboard at the same time ---
+    # The file write (possibly to a slow home directory) must not hold up the clipboard
+    write_errors = []
+    writer = threading.Thread(target=write_file, args=(filepath, png, write_errors))
+    writer.start()
+
+    try:
+        subprocess.run(["wl-copy", "--type", "image/png"], input=png, check=True)
+        print("Copied screenshot to clipboard!")
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        print("Clipboard copy failed!")
+
+    writer.join()
+    if write_errors:
+        print("Saving screenshot failed:", write_errors[0])
+        exit(1)
     print(f"Screenshot saved: {filepath}")
 
-except subprocess.CalledProcessError as e:
-    print("Screenshot failed:", e)
-    exit(1)
-
-# --- Copy to clipboard ---
-try:
-    subprocess.run(f"wl-copy < {shlex.quote(filepath)}", shell=True, check=True)
-    print("Copied screenshot to clipboard!")
-except subprocess.CalledProcessError:
-    print("Clipboard copy failed!")
-
-# --- Send notification with click action ---
-# Requires 'dunst' or Wayland notification daemon that supports actions
-# -c or -t sets timeout (ms), default is 3s = 3000ms
-# 'notify-send' supports -a (app name) and -u (urgency)
-
-# Build command
-notify_cmd = [
-    "notify-send",
-    "-u", "normal",
-    "-a", "Screenshot Tool",
-    "-t", "3000",           # auto-dismiss after 3s
-    "-i", "camera-photo",   # icon
-    "Screenshot Taken",
-    filepath,
-    "-h", "string:x-canonical-private-synchronous:screenshot",  # prevent stacking multiple
-    "-h", f"string:action:xdg-open {shlex.quote(filepath)}"
-]
-
-# On Wayland, clicking an action opens GIMP
-# Unfortunately vanilla notify-send can't directly attach click commands
-# Workaround: use 'xdg-open' for file
-# We can send a notification and rely on the user clicking it manually
-# Many Wayland notification daemons (dunst, mako) will open via 'xdg-open' if file is a URL/path
-
-try:
-    subprocess.run(["notify-send",
-                    "Screenshot Taken",
-                    filepath,
-                    "-u", "normal",
-                    "-t", "3000",
-                    "-i", "camera-photo"], check=True)
-except subprocess.CalledProcessError:
-    print("Notification failed!")
-
-# Optional: open GIMP automatically on click
-# Some notification daemons (mako) can trigger commands on click via 'notify-send --action'
-# But we’ll do a simple workaround: send a command via 'xdg-open' as if the user clicked
-
-# If you want fully automatic: uncomment this line
-# subprocess.run(["gimp", filepath])
+    # --- Send notification ---
+    notify(filepath)
+
+    # Optional: open GIMP automatically
+    # subprocess.run(["gimp", filepath])
+
+
+if __name__ == "__main__":
+    if not capture_with_daemon():
+        capture_standalone()
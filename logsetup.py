@@ -0,0 +1,174 @@
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+
+LOGGER_NAME = "PySSUtil"
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+ARCHIVE_TIME_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+_listener = None
+_compactor = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Ein JSON-Objekt pro Zeile, für Log-Shipper"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class LogCompactor:
+    """Komprimiert archivierte Logs im Hintergrund und löscht die ältesten"""
+
+    def __init__(self, logs_path, retention, active="latest.log"):
+        self.logs_path = logs_path
+        self.retention = retention
+        self.active = active
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._loop, name="log-compactor", daemon=True)
+        self.thread.start()
+
+    def submit(self, path):
+        self.queue.put(path)
+
+    def stop(self, timeout=5):
+        self.queue.put(None)
+        self.thread.join(timeout=timeout)
+
+    def _loop(self):
+        while True:
+            path = self.queue.get()
+            if path is None:
+                return
+            try:
+                self._compress(path)
+                self._prune()
+            except Exception as e:
+                # The logging system itself is the thing that is failing here
+                print(f"Error compacting log {path}: {e}")
+
+    def _compress(self, path):
+        if not os.path.exists(path) or path.endswith(".gz"):
+            return
+        with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+
+    def _prune(self):
+        if self.retention <= 0:
+            return
+        archives = sorted(
+            name for name in os.listdir(self.logs_path)
+            if name.endswith(".log.gz") or (name.endswith(".log") and name != self.active)
+        )
+        for name in archives[:-self.retention]:
+            os.remove(os.path.join(self.logs_path, name))
+
+
+class RotatingLogHandler(logging.handlers.RotatingFileHandler):
+    """Rotiert nach Größe oder Alter und übergibt Archive dem Compactor"""
+
+    def __init__(self, filename, max_bytes=0, rotate_seconds=0, compactor=None, encoding="utf-8"):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=0, encoding=encoding, delay=True)
+        self.rotate_seconds = rotate_seconds
+        self.compactor = compactor
+        self.opened_at = time.time()
+
+    def shouldRollover(self, record):
+        if self.rotate_seconds and time.time() - self.opened_at >= self.rotate_seconds:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        archived = archive_log(self.baseFilename)
+        if archived and self.compactor is not None:
+            self.compactor.submit(archived)
+        self.opened_at = time.time()
+        self.stream = self._open()
+
+
+def archive_log(path):
+    """Benenne ein Log nach seiner letzten Änderungszeit um (wie bisher latest.log)"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    timestamp = datetime.fromtimestamp(os.path.getmtime(path)).strftime(ARCHIVE_TIME_FORMAT)
+    archived = os.path.join(os.path.dirname(path), f"{timestamp}.log")
+    suffix = 1
+    while os.path.exists(archived) or os.path.exists(archived + ".gz"):
+        archived = os.path.join(os.path.dirname(path), f"{timestamp}_{suffix}.log")
+        suffix += 1
+    os.rename(path, archived)
+    return archived
+
+
+def configure_logging(logs_path, filename="latest.log", archive_existing=True, level="DEBUG",
+                      log_format="text", max_bytes=0, rotate_seconds=0, retention=0, console=True):
+    """Richte das Queue-basierte Logging ein; Aufrufer schreiben nur noch in eine Queue"""
+    global _listener, _compactor
+    shutdown_logging()
+
+    os.makedirs(logs_path, exist_ok=True)
+    _compactor = LogCompactor(logs_path, retention, active=filename)
+    log_file = os.path.join(logs_path, filename)
+    if archive_existing:
+        archived = archive_log(log_file)
+        if archived:
+            _compactor.submit(archived)
+
+    if log_format == "json":
+        formatter = JsonLinesFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+
+    handlers = [RotatingLogHandler(log_file, max_bytes, rotate_seconds, _compactor)]
+    if console:
+        handlers.append(logging.StreamHandler())  # still prints to console
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return logging.getLogger(LOGGER_NAME)
+
+
+def shutdown_logging():
+    """Schreibe alle eingereihten Log-Einträge und stoppe den Listener"""
+    global _listener, _compactor
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _compactor is not None:
+        _compactor.stop()
+        _compactor = None
+
+
+atexit.register(shutdown_logging)
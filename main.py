@@ -1,146 +1,449 @@
-import pystray
-from PIL import Image, ImageDraw, ImageGrab
+import time
+STARTED = time.perf_counter()
+
+# pystray, pyautogui, customtkinter and tkinter are imported where they are first
+# used, they are not needed to get the hotkeys up
+from PIL import Image, ImageDraw
 import threading
-import pyautogui
 import keyboard
 import os
 import sys
 from datetime import datetime
-from screeninfo import get_monitors
 import json
-import psutil
-import ctypes
-from tkinter import messagebox
-import socket
-import customtkinter as ctk
-import time
 import logging
+import argparse
+import io
+import queue
+import metrics
+from pipeline import CapturePipeline, Frame, monitor_info
+from replay import ReplayBuffer
+from monitors import MonitorTopology
+from encoders import get_encoder
+from capture import get_backend
+from trigger import TriggerScheduler
+from timelapse import IntervalScheduler, idle_seconds
+from session import SessionWatcher
+from storage import ScreenshotStore
+from delta import DeltaStore, export_segment
+from strips import BufferPool, MemoryBudget, PROFILE_LEVELS, capture_strips, peak_rss_mb
+from thumbnails import ThumbnailCache, backfill as backfill_thumbnails
+from settings import SettingsStore
+from logsetup import configure_logging, shutdown_logging
+from ipc import IPCServer, IPC_HOST, IPC_PORT, acquire_instance_socket, send_command
 
-HOTKEY_REFRESH_INTERVAL = 60 * 60  # 60 minutes
-CHECK_INTERVAL = 5                 # 5 seconds
+HOTKEY_PROBE_TIMEOUT = 1          # seconds to wait for the injected probe key
+HOTKEY_PROBE_PRESENT = 5          # seconds since real input, only then may a probe key be injected
+HOTKEY_ACTIONS = ("screenshot_key", "open_folder_key")
 
-EXENAME = "pyscreenshotutil.exe"
 SCREENSHOTPATH = "screenshots"
 SETTINGS_FILE = "settings.json"
 
 LOG_DIR = "logs"
 
+DEFAULT_SETTINGS = {
+    "screenshot_key": "f10",
+    "open_folder_key": "f9",
+    "screenshot_path": SCREENSHOTPATH,
+    "logs_path": LOG_DIR,
+    "pipeline_workers": min(4, os.cpu_count() or 1),
+    "pipeline_queue_size": 8,
+    "pipeline_backpressure": "block",  # block, drop_oldest or spill
+    "pipeline_spill_path": os.path.join(SCREENSHOTPATH, ".spill"),
+    "capture_mode": "monitor",  # monitor, all (every monitor from one grab), strips (memory bounded, Windows and grim) or replay
+    "capture_all_stitched": False,  # in "all" mode also save the whole desktop as one image
+    "strip_target": "desktop",  # strips mode: desktop (all screens as one image) or monitor
+    "strip_memory_mb": 64,  # budget shared by all running strip captures
+    "timelapse_enabled": False,
+    "timelapse_interval": 60,  # seconds between shots
+    "timelapse_target": "monitor",  # monitor (under the mouse) or all
+    "timelapse_idle_pause": 300,  # pause after this many seconds without input or while locked, 0 only on lock
+    "capture_backend": "auto",  # auto, imagegrab, grim (Wayland) or fake
+    "replay_fps": 2,
+    "replay_seconds": 10,
+    "replay_memory_mb": 256,
+    "replay_compress": False,
+    "replay_save": "all",  # all or latest
+    "encoder": "png",  # png, webp, jpeg, qoi or raw
+    "encoder_profile": "balanced",  # fastest, balanced or smallest
+    "encoder_options": {},
+    "metrics_enabled": True,
+    "hotkey_probe_key": "f24",  # injected on unlock/resume to check that the keyboard hook is alive, "" disables
+    "hotkey_probe_interval": 0,  # seconds between passive checks (input the hook missed, nothing is sent), 0 only checks on events
+    "trigger_policy": "once",  # once per burst, each press, or rate (fixed rate while held)
+    "trigger_debounce": 0.15,  # seconds, closer presses count as one (bounce, auto-repeat)
+    "trigger_window": 0.5,  # seconds without a press that end a burst
+    "trigger_rate": 2,  # captures per second for the rate policy
+    "trigger_max_in_flight": 2,  # further triggers are dropped while this many captures run
+    "log_level": "DEBUG",
+    "log_format": "text",  # text or json (one JSON object per line)
+    "log_max_mb": 10,
+    "log_rotate_hours": 24,
+    "log_retention": 30,  # archived logs to keep, 0 keeps all
+    "log_console": True,
+    "retention_days": 0,  # delete screenshots older than this, 0 keeps all
+    "retention_max_mb": 0,  # delete the oldest screenshots above this total, 0 disables
+    "dedup": "exact",  # off, exact (identical pixels) or perceptual (near-identical)
+    "dedup_threshold": 4,  # differing dHash bits that still count as a duplicate
+    "dedup_index_size": 4096,
+    "delta_mode": "off",  # off, timelapse or all: store repeated shots as changed tiles against a keyframe
+    "delta_tile": 64,  # tile edge in pixels
+    "delta_keyframe_interval": 100,  # frames per segment, each segment starts with a full keyframe
+    "durability": "group",  # none, file (fsync every shot) or group (fsync batches, see below)
+    "durability_group_files": 16,  # group commit after this many files...
+    "durability_group_ms": 200,  # ...or after this many milliseconds, whichever comes first
+    "spool_path": "",  # local folder used while screenshot_path is slow or unreachable, "" disables
+    "spool_slow_ms": 1000,  # a write slower than this switches to the spool for a while
+    "catalog_path": "",  # folder of catalog.sqlite3, "" uses spool_path if set, else screenshot_path
+    "thumbnails_enabled": True,
+    "thumbnail_size": 256,  # longest edge in pixels
+    "thumbnail_cache_mb": 256  # least recently used thumbnails are deleted above this
+}
+
+settings_store = None
+settings_store_lock = threading.Lock()
+
+# Modules that are imported lazily but needed on the first hotkey press
+PRELOAD_MODULES = ("pyautogui",)
+
+# Replaced by define_logger, but lets the module be used (e.g. by the benchmarks) without it
+logger = logging.getLogger("PySSUtil")
+
+def get_settings_store():
+    """Der prozessweite Settings-Store (SETTINGS_FILE wird nur einmal geparst)"""
+    global settings_store
+    with settings_store_lock:
+        if settings_store is None:
+            settings_store = SettingsStore(SETTINGS_FILE, DEFAULT_SETTINGS)
+        return settings_store
+
+def catalog_dir(settings):
+    """Ordner des Katalogs: lokal, sobald ein Spool für ein langsames Ziel eingerichtet ist"""
+    return settings["catalog_path"] or settings["spool_path"] or None
+
 class HotkeyManager:
-    def __init__(self):
+    def __init__(self, tool=None):
+        self.tool = tool or ScreenshotTool()
+        self.bindings = {}     # action -> (key, keyboard handle)
+        self.generations = {}  # action -> generation of the binding that may fire
+        self.lock = threading.Lock()
+        self.events = queue.Queue()
         self.stop_event = threading.Event()
+        self.probe_seen = threading.Event()
+        self.probe_hook = None
+        self.last_hook_event = time.monotonic()
+        self.activity_hook = None
+        self.session = SessionWatcher(self.request_check)
+        self.listener_restarts = 0
         self.thread = threading.Thread(
-            target=self._watchdog_loop,
+            target=self._supervisor_loop,
             daemon=True
         )
 
     def start(self):
-        self.register_hotkeys()
+        ScreenshotTool.hotkeys = self
+        self.tool.setup_hotkeys()
+        try:
+            self.activity_hook = keyboard.hook(self._on_key_event)
+        except Exception as e:
+            logger.error(f"Error hooking keyboard activity: {e}")
         self.thread.start()
+        self.session.start()
+        self._watch_listener()
+        self.request_check("startup")
 
     def stop(self):
         self.stop_event.set()
+        self.events.put(None)
+        self.session.stop()
         self.unregister_hotkeys()
 
-    def register_hotkeys(self):
+    def register_hotkeys(self, actions=None, force=False):
         #print("Registering hotkeys...")
         logger.info("Registering hotkeys...")
-        tool = ScreenshotTool()
-        tool.setup_hotkeys()
-        # YOUR HOTKEY REGISTRATION CODE HERE
-        # Example:
-        # keyboard.add_hotkey('ctrl+shift+s', self.take_screenshot)
+        callbacks = {
+            # Goes through the trigger scheduler, so held keys and double presses don't pile up
+            "screenshot_key": self.tool.trigger_screenshot,
+            "open_folder_key": self.tool.open_folder,
+        }
+        for action in (HOTKEY_ACTIONS if actions is None else actions):
+            self._bind(action, callbacks[action], force)
+        logger.info(f"Hotkeys: {self.tool.settings['screenshot_key']} (screenshot), {self.tool.settings['open_folder_key']} (folder)")
+
+    def _bind(self, action, callback, force=False):
+        key = self.tool.settings[action]
+        with self.lock:
+            current = self.bindings.get(action)
+            if current is not None and current[0] == key and not force:
+                return
+            generation = self.generations.get(action, 0) + 1
+
+            def on_hotkey():
+                # Old and new binding overlap for a moment, only the current one may fire
+                if self.generations.get(action) == generation:
+                    callback()
+
+            try:
+                handle = keyboard.add_hotkey(key, on_hotkey, suppress=False)
+            except Exception as e:
+                logger.error(f"Error registering hotkey {key} for {action}: {e}")
+                return
+            # The new binding is live before the old one is removed, so no press is lost
+            self.generations[action] = generation
+            self.bindings[action] = (key, handle)
+            if current is not None:
+                self._remove(current[1])
+
+    def _remove(self, handle):
+        try:
+            keyboard.remove_hotkey(handle)
+        except (KeyError, ValueError):
+            pass
 
     def unregister_hotkeys(self):
         #print("Unregistering hotkeys...")
         logger.info("Unregistering hotkeys...")
-        # Clean up old hotkeys here
-        # Example:
-        keyboard.unhook_all_hotkeys()
+        with self.lock:
+            for key, handle in self.bindings.values():
+                self._remove(handle)
+            self.bindings.clear()
+            self.generations.clear()
+
+    def request_check(self, reason):
+        """Lass den Supervisor die Hooks prüfen (z.B. nach Einstellungsänderungen)"""
+        self.events.put(reason)
+
+    def _on_key_event(self, event):
+        self.last_hook_event = time.monotonic()
+
+    def missed_input(self):
+        """True, wenn es echte Eingaben gab, die der Hook nicht gesehen hat (sendet selbst nichts)"""
+        idle = idle_seconds()
+        if idle is None:
+            return False
+        # Mouse input counts as well, so this is only a suspicion the probe key has to confirm
+        return time.monotonic() - idle > self.last_hook_event + HOTKEY_PROBE_TIMEOUT
+
+    def probe(self):
+        """Prüfe, ob der Tastatur-Hook noch Ereignisse liefert"""
+        listener = getattr(keyboard, "_listener", None)
+        thread = getattr(listener, "listening_thread", None)
+        if thread is not None and not thread.is_alive():
+            return False
+
+        probe_key = self.tool.settings["hotkey_probe_key"]
+        if self.probe_hook is not None and self.probe_hook[0] != probe_key:
+            # The probe key changed in the settings, waiting on the old hook would always time out
+            try:
+                keyboard.unhook(self.probe_hook[1])
+            except (KeyError, ValueError):
+                pass
+            self.probe_hook = None
+        if not probe_key:
+            return True
+        if self.probe_hook is None:
+            self.probe_hook = (probe_key, keyboard.hook_key(probe_key, lambda event: self.probe_seen.set(), suppress=False))
+        self.probe_seen.clear()
+        keyboard.send(probe_key)
+        return self.probe_seen.wait(HOTKEY_PROBE_TIMEOUT)
+
+    def _restart_listener(self):
+        """Starte nur den Hook-Thread neu; False, wenn der alte nicht beendet werden konnte"""
+        listener = getattr(keyboard, "_listener", None)
+        if listener is None:
+            return False
+        old = getattr(listener, "listening_thread", None)
+        if old is not None and old.is_alive():
+            self._stop_listening_thread(old)
+            if old.is_alive():
+                # A second hook thread would feed every event twice into keyboard's state machine
+                logger.warning("Old keyboard hook thread is still running, not starting a second one")
+                return False
+        with listener.lock:
+            # The processing thread only reads listener.queue, it is kept so events stay in order
+            listener.listening_thread = threading.Thread(target=listener.listen, daemon=True)
+            listener.listening_thread.start()
+            processing = getattr(listener, "processing_thread", None)
+            if processing is None or not processing.is_alive():
+                listener.processing_thread = threading.Thread(target=listener.process, daemon=True)
+                listener.processing_thread.start()
+        self.listener_restarts += 1
+        self._watch_listener()
+        return True
+
+    def _stop_listening_thread(self, thread):
+        if sys.platform != "win32" or thread.native_id is None:
+            # The Linux hook blocks on /dev/input and cannot be interrupted from outside
+            return
+        import ctypes
+        WM_USER = 0x0400
+        # keyboard's message loop ends on the first message that is not WM_QUIT,
+        # the hook goes away with its thread
+        ctypes.windll.user32.PostThreadMessageW(thread.native_id, WM_USER, 0, 0)
+        thread.join(HOTKEY_PROBE_TIMEOUT)
+
+    def _watch_listener(self):
+        listener = getattr(keyboard, "_listener", None)
+        thread = getattr(listener, "listening_thread", None)
+        if thread is None:
+            return
 
-    def _watchdog_loop(self):
-        last_refresh = time.time()
+        def wait_for_exit():
+            # Blocks without waking up until the hook thread actually dies
+            thread.join()
+            if not self.stop_event.is_set():
+                self.request_check("listener stopped")
 
+        threading.Thread(target=wait_for_exit, daemon=True).start()
+
+    def _supervisor_loop(self):
         while not self.stop_event.is_set():
-            time.sleep(CHECK_INTERVAL)
+            # Wakes on events (startup, unlock, resume, settings) and, if set, every check interval
+            interval = self.tool.settings["hotkey_probe_interval"] or None
+            try:
+                reason = self.events.get(timeout=interval)
+            except queue.Empty:
+                # No key is injected on a timer, that would reset the idle timer (screen lock,
+                # sleep, timelapse_idle_pause). Only while the user is at the machine anyway
+                # is a suspicion confirmed with the probe key.
+                if not self.missed_input() or idle_seconds() > HOTKEY_PROBE_PRESENT:
+                    continue
+                reason = "input the hook did not see"
+            if reason is None:
+                break
 
-            # Refresh hotkeys every 30 minutes
-            if time.time() - last_refresh >= HOTKEY_REFRESH_INTERVAL:
-                logger.debug("Refreshing hotkeys...")
-                #print("Refreshing hotkeys...")
-                self.unregister_hotkeys()
-                self.register_hotkeys()
-                last_refresh = time.time()
+            try:
+                if self.probe():
+                    logger.debug(f"Hotkey hook alive ({reason})")
+                    continue
+                logger.warning(f"Hotkey hook not responding ({reason}), restarting listener...")
+                if self._restart_listener():
+                    self.register_hotkeys(force=True)
+            except Exception as e:
+                logger.error(f"Error checking hotkeys: {e}")
 
-        logger.warning("Hotkey watchdog thread stopped.")
+        logger.warning("Hotkey supervisor thread stopped.")
         #print("Hotkey watchdog thread stopped.")
 
 class ScreenshotTool:
+    # Shared by every ScreenshotTool instance so hotkeys, tray and IPC feed one worker pool
+    pipeline = None
+    pipeline_lock = threading.Lock()
+    # Held while a store or thumbnail cache is built (slow on a big or remote screenshot_path),
+    # pipeline_lock only to publish it, so captures never wait for the construction
+    store_lock = threading.Lock()
+    thumbnails_lock = threading.Lock()
+    replay_buffer = None
+    hotkeys = None
+    store = None
+    delta = None
+    thumbnails = None
+    backend = None
+    trigger = None
+    timelapse = None
+    strip_budget = None
+    strip_buffers = BufferPool()
+    monitors = MonitorTopology()
+
     def __init__(self):
-        self.settings = self.load_settings()
         self.icon = None
         self.settings_window = None
         #self.setup_hotkeys()
         
+    @property
+    def settings(self):
+        return get_settings_store().data
+    
     def load_settings(self):
-        """Lade Einstellungen aus JSON oder verwende Standardwerte"""
-        default_settings = {
-            "screenshot_key": "f10",
-            "open_folder_key": "f9",
-            "screenshot_path": SCREENSHOTPATH,
-            "logs_path": LOG_DIR
-        }
-        
-        try:
-            if os.path.exists(SETTINGS_FILE):
-                with open(SETTINGS_FILE, 'r') as f:
-                    settings = json.load(f)
-                    return {**default_settings, **settings}
-            else:
-                self.settings = default_settings
-                self.save_settings()
-        except Exception as e:
-            logger.error(f"Error loading settings: {e}")
-            #print(f"Error loading settings: {e}")
-        
-        return default_settings
+        """Liefere die Einstellungen aus dem gemeinsamen Settings-Store"""
+        return get_settings_store().data
     
     def save_settings(self):
-        global logger
-        """Speichere Einstellungen in JSON"""
-        try:
-            with open(SETTINGS_FILE, 'w') as f:
-                json.dump(self.settings, f, indent=4)
-            logger.info("Settings saved!")
-            #print("Settings saved!")
-        except Exception as e:
-            logger.error(f"Error saving settings: {e}")
-            #print(f"Error saving settings: {e}")
-            
+        """Speichere Einstellungen in JSON (verzögert und atomar)"""
+        get_settings_store().schedule_save()
+    
+    def apply_settings_change(self, changed):
+        """Übernimm extern geänderte Einstellungen, nur für die betroffenen Schlüssel"""
+        # No HotkeyManager in daemon mode, the compositor owns the keys there
+        if changed & set(HOTKEY_ACTIONS) and ScreenshotTool.hotkeys is not None:
+            self.setup_hotkeys(changed & set(HOTKEY_ACTIONS))
+        if changed & {"hotkey_probe_key", "hotkey_probe_interval"} and ScreenshotTool.hotkeys is not None:
+            ScreenshotTool.hotkeys.request_check("settings changed")
+        if changed & {"screenshot_path", "retention_days", "retention_max_mb", "dedup", "dedup_threshold", "dedup_index_size",
+                      "delta_mode", "delta_tile", "delta_keyframe_interval", "durability", "durability_group_files",
+                      "durability_group_ms", "spool_path", "spool_slow_ms", "catalog_path"}:
+            os.makedirs(self.settings["screenshot_path"], exist_ok=True)
+            logger.info(f"Screenshot path: {self.settings['screenshot_path']}")
+            with ScreenshotTool.store_lock, ScreenshotTool.pipeline_lock:
+                old_store, ScreenshotTool.store = ScreenshotTool.store, None
+                # Delta segments are written through the store, a new store starts new segments
+                ScreenshotTool.delta = None
+            if old_store is not None:
+                # Frames already queued may still be writing through the old store
+                if ScreenshotTool.pipeline is not None:
+                    ScreenshotTool.pipeline.flush(timeout=10)
+                old_store.close()
+        if changed & {"screenshot_path", "thumbnails_enabled", "thumbnail_size", "thumbnail_cache_mb"}:
+            with ScreenshotTool.thumbnails_lock, ScreenshotTool.pipeline_lock:
+                # The old cache's worker finishes its queue and then idles
+                ScreenshotTool.thumbnails = None
+        if any(key.startswith("trigger_") for key in changed):
+            with ScreenshotTool.pipeline_lock:
+                old_trigger, ScreenshotTool.trigger = ScreenshotTool.trigger, None
+            if old_trigger is not None:
+                old_trigger.stop()
+        if any(key.startswith("timelapse_") for key in changed):
+            self.stop_timelapse()
+            self.start_timelapse()
+        if "strip_memory_mb" in changed:
+            # Captures already running release into the old budget
+            ScreenshotTool.strip_budget = None
+        if "capture_backend" in changed:
+            ScreenshotTool.backend = None
+        if "metrics_enabled" in changed:
+            metrics.set_enabled(self.settings["metrics_enabled"])
+        if changed & {"capture_mode", "replay_fps", "replay_seconds", "replay_memory_mb", "replay_compress"}:
+            if ScreenshotTool.replay_buffer is not None:
+                ScreenshotTool.replay_buffer.stop()
+                ScreenshotTool.replay_buffer = None
+            self.start_replay()
+        restart_keys = sorted(key for key in changed if key.startswith("pipeline_"))
+        if restart_keys:
+            logger.warning(f"Changed settings take effect after a restart: {', '.join(restart_keys)}")
     
-    def setup_hotkeys(self):
+    def setup_hotkeys(self, actions=None):
         """Registriere die Hotkeys basierend auf den Einstellungen"""
+        started = metrics.start()
         try:
-            # Entferne alle existierenden Hotkeys
-            keyboard.unhook_all()
-            
-            # Registriere neue Hotkeys
-            keyboard.add_hotkey(self.settings["screenshot_key"], self.take_screenshot, suppress=False)
-            keyboard.add_hotkey(self.settings["open_folder_key"], self.open_folder, suppress=False)
-            logger.info(f"Hotkeys: {self.settings['screenshot_key']} (screenshot), {self.settings['open_folder_key']} (folder)")
-            #print(f"Hotkeys: {self.settings['screenshot_key']} (screenshot), {self.settings['open_folder_key']} (folder)")
+            # Bindings are swapped in place by the HotkeyManager, nothing is unhooked first
+            if ScreenshotTool.hotkeys is None:
+                ScreenshotTool.hotkeys = HotkeyManager(self)
+            ScreenshotTool.hotkeys.register_hotkeys(actions)
         except Exception as e:
             logger.error(f"Error setting up hotkeys: {e}")
             #print(f"Error setting up hotkeys: {e}")
+        metrics.stop("setup_hotkeys", started)
+    
+    def get_backend(self):
+        """Hole das gemeinsame Capture-Backend (ImageGrab, grim oder fake)"""
+        with ScreenshotTool.pipeline_lock:
+            if ScreenshotTool.backend is None:
+                ScreenshotTool.backend = get_backend(self.settings["capture_backend"])
+                logger.info(f"Capture backend: {ScreenshotTool.backend.name}")
+            return ScreenshotTool.backend
     
     def get_mouse_monitor(self):
-        """Finde den Monitor, auf dem sich die Maus befindet"""
-        mouse_x, mouse_y = pyautogui.position()
-        
-        for monitor in get_monitors():
-            if (monitor.x <= mouse_x < monitor.x + monitor.width and
-                monitor.y <= mouse_y < monitor.y + monitor.height):
-                return monitor
-        return get_monitors()[0]
+        """Finde den Monitor, auf dem sich die Maus befindet (None, wenn unbekannt)"""
+        started = metrics.start()
+        position = self.get_backend().cursor_position()
+        monitor = None
+        if position is not None:
+            try:
+                monitor = ScreenshotTool.monitors.lookup(*position)
+            except Exception as e:
+                # e.g. screeninfo has no enumerator for a pure Wayland session
+                logger.warning(f"Monitor lookup failed, capturing all screens: {e}")
+        metrics.stop("monitor_lookup", started)
+        return monitor
     
     def open_folder(self):
         """Öffne den Screenshot-Ordner"""
@@ -152,32 +455,406 @@ class ScreenshotTool:
             logger.error(f"Error opening folder: {e}")
             #print(f"Error opening folder: {e}")
     
+    def get_pipeline(self):
+        """Hole die gemeinsame Capture-Pipeline (wird beim ersten Aufruf gestartet)"""
+        with ScreenshotTool.pipeline_lock:
+            if ScreenshotTool.pipeline is None:
+                ScreenshotTool.pipeline = CapturePipeline(
+                    self.save_frame,
+                    workers=self.settings["pipeline_workers"],
+                    queue_size=self.settings["pipeline_queue_size"],
+                    backpressure=self.settings["pipeline_backpressure"],
+                    spill_path=self.settings["pipeline_spill_path"]
+                )
+            return ScreenshotTool.pipeline
+    
+    def grab_mouse_monitor(self):
+        """Grabbe den Monitor, auf dem sich die Maus befindet"""
+        monitor = self.get_mouse_monitor()
+        
+        bbox = None
+        if monitor is not None:
+            bbox = (monitor.x, monitor.y, 
+                    monitor.x + monitor.width, 
+                    monitor.y + monitor.height)
+        
+        started = metrics.start()
+        image = self.get_backend().grab(bbox)
+        metrics.stop("grab", started)
+        return image, monitor_info(monitor)
+    
+    def get_trigger(self):
+        """Hole den gemeinsamen Trigger-Scheduler für die Screenshot-Taste"""
+        with ScreenshotTool.pipeline_lock:
+            if ScreenshotTool.trigger is None:
+                ScreenshotTool.trigger = TriggerScheduler(
+                    self.take_screenshot,
+                    policy=self.settings["trigger_policy"],
+                    debounce=self.settings["trigger_debounce"],
+                    window=self.settings["trigger_window"],
+                    rate=self.settings["trigger_rate"],
+                    max_in_flight=self.settings["trigger_max_in_flight"]
+                )
+            return ScreenshotTool.trigger
+    
+    def trigger_screenshot(self):
+        """Screenshot-Taste gedrückt: der Scheduler entscheidet, ob und wann aufgenommen wird"""
+        self.get_trigger().trigger()
+    
     def take_screenshot(self):
         """Mache einen Screenshot des aktuellen Monitors"""
+        if ScreenshotTool.replay_buffer is not None:
+            self.save_replay()
+            return
+        started = metrics.start()
         try:
             logger.info("Taking screenshot...")
             #print("Taking screenshot...")
-            monitor = self.get_mouse_monitor()
-            
-            bbox = (monitor.x, monitor.y, 
-                    monitor.x + monitor.width, 
-                    monitor.y + monitor.height)
+            if self.settings["capture_mode"] == "all":
+                self.capture_all_monitors()
+                metrics.stop("take_screenshot", started)
+                return
+            if self.settings["capture_mode"] == "strips":
+                self.capture_in_strips()
+                metrics.stop("take_screenshot", started)
+                return
+            image, monitor = self.grab_mouse_monitor()
             
-            image = ImageGrab.grab(bbox=bbox, all_screens=True)
-            
-            screenshot_path = self.settings["screenshot_path"]
-            os.makedirs(screenshot_path, exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            filename = os.path.join(screenshot_path, f"screenshot_{timestamp}.png")
-            save_path = os.path.join(os.getcwd(), filename)
-            image.save(save_path, "PNG")
-            logger.info(f"Screenshot saved: {save_path}")
-            #print(f"Screenshot saved: {save_path}")
+            # Encoding and writing happen on the pipeline workers, not on the hotkey thread
+            submitted = metrics.start()
+            self.get_pipeline().submit(Frame(image, datetime.now(), monitor))
+            metrics.stop("submit", submitted)
             
         except Exception as e:
             logger.error(f"Error taking screenshot: {e}")
             #print(f"Error taking screenshot: {e}")
+        metrics.stop("take_screenshot", started)
+    
+    def capture_all_monitors(self, name=None):
+        """Ein Grab des ganzen Desktops, aufgeteilt wird erst auf den Pipeline-Workern"""
+        try:
+            monitors = ScreenshotTool.monitors.get_monitors()
+        except Exception as e:
+            logger.warning(f"Monitor enumeration failed, saving the desktop as one image: {e}")
+            monitors = []
+        
+        started = metrics.start()
+        desktop = self.get_backend().grab(None)
+        metrics.stop("grab", started)
+        captured_at = datetime.now()
+        
+        pipeline = self.get_pipeline()
+        if monitors:
+            # The all_screens grab starts at the top-left corner of the virtual desktop
+            left = min(monitor.x for monitor in monitors)
+            top = min(monitor.y for monitor in monitors)
+            for monitor in monitors:
+                box = (monitor.x - left, monitor.y - top,
+                       monitor.x - left + monitor.width, monitor.y - top + monitor.height)
+                # Every frame shares the desktop image, each worker crops its own monitor
+                pipeline.submit(Frame(desktop, captured_at, monitor_info(monitor), name, crop=box))
+        if not monitors or self.settings["capture_all_stitched"]:
+            pipeline.submit(Frame(desktop, captured_at, name="desktop"))
+        return len(monitors)
+    
+    def capture_in_strips(self):
+        """Grabbe und schreibe streifenweise als PNG, innerhalb des Speicherbudgets"""
+        monitor = None
+        if self.settings["strip_target"] == "monitor":
+            monitor = self.get_mouse_monitor()
+            monitors = [monitor] if monitor is not None else []
+        else:
+            monitors = ScreenshotTool.monitors.get_monitors()
+        if not monitors:
+            raise RuntimeError("Strip capture needs the monitor geometry")
+        bbox = (min(m.x for m in monitors), min(m.y for m in monitors),
+                max(m.x + m.width for m in monitors), max(m.y + m.height for m in monitors))
+        
+        backend = self.get_backend()
+        if not backend.region_grab:
+            # ImageGrab on X11/macOS grabs every screen for any box, strips would bound nothing
+            logger.warning(f"Capture backend '{backend.name}' cannot grab a region on its own, "
+                           "strips mode falls back to a single full grab")
+            frame = Frame(backend.grab(bbox), datetime.now(), monitor_info(monitor), "desktop" if monitor is None else None)
+            self.get_pipeline().submit(frame)
+            return None
+        
+        with ScreenshotTool.pipeline_lock:
+            if ScreenshotTool.strip_budget is None:
+                ScreenshotTool.strip_budget = MemoryBudget(self.settings["strip_memory_mb"] * 1024 * 1024)
+            budget = ScreenshotTool.strip_budget
+        
+        store = self.get_store()
+        frame = Frame(None, datetime.now(), monitor_info(monitor), "desktop" if monitor is None else None)
+        _, path = store.path_for(frame, ".png")
+        started = metrics.start()
+        # Bypasses the pipeline: the full frame never exists, so there is nothing to hand over.
+        # A failed capture only leaves a temporary file behind, which the writer removes
+        with store.writer.open(path) as f:
+            writer = capture_strips(backend.grab_region, bbox, f, budget, ScreenshotTool.strip_buffers,
+                                    PROFILE_LEVELS.get(self.settings["encoder_profile"], 6),
+                                    grab_bytes_per_pixel=backend.region_bytes_per_pixel)
+        metrics.stop("strip_capture", started)
+        width, height = bbox[2] - bbox[0], bbox[3] - bbox[1]
+        store.record(frame, path, writer.bytes_written, "png", writer.digest.hexdigest(), dimensions=(width, height))
+        
+        stats = budget.stats()
+        peak_rss = peak_rss_mb()
+        logger.info(f"Screenshot saved in strips: {path} ({width}x{height}), "
+                    f"budget peak {stats['peak'] / 1024 / 1024:.1f}/{stats['limit'] / 1024 / 1024:.0f} MB"
+                    + (f", process peak RSS {peak_rss:.0f} MB" if peak_rss is not None else ""))
+        return path
+    
+    def capture_region(self, copy=False):
+        """Lass den Benutzer einen Bereich wählen und speichere ihn (ohne Auswahl: alles)"""
+        backend = self.get_backend()
+        bbox = backend.select_region()
+        started = metrics.start()
+        image = backend.grab(bbox)
+        metrics.stop("grab", started)
+        self.get_pipeline().submit(Frame(image, datetime.now()))
+        copied = False
+        if copy:
+            try:
+                copied = backend.copy_to_clipboard(image)
+            except Exception as e:
+                logger.error(f"Error copying screenshot to clipboard: {e}")
+        return {"queued": 1, "region": bbox, "copied": copied}
+    
+    def timelapse_shot(self):
+        """Ein Schuss des Zeitraffers (läuft im Scheduler-Thread, nie überlappend)"""
+        if self.settings["timelapse_target"] == "all":
+            self.capture_all_monitors(name="timelapse")
+            return
+        image, monitor = self.grab_mouse_monitor()
+        self.get_pipeline().submit(Frame(image, datetime.now(), monitor, "timelapse"))
+    
+    def start_timelapse(self):
+        """Starte den Zeitraffer, falls er in den Einstellungen aktiviert ist"""
+        if not self.settings["timelapse_enabled"] or ScreenshotTool.timelapse is not None:
+            return
+        ScreenshotTool.timelapse = IntervalScheduler(
+            self.timelapse_shot,
+            interval=self.settings["timelapse_interval"],
+            idle_pause=self.settings["timelapse_idle_pause"]
+        )
+        ScreenshotTool.timelapse.start()
+    
+    def stop_timelapse(self):
+        if ScreenshotTool.timelapse is not None:
+            ScreenshotTool.timelapse.stop()
+            ScreenshotTool.timelapse = None
+    
+    def toggle_timelapse(self):
+        """Tray-Menü: Zeitraffer ein-/ausschalten (wird in den Einstellungen gespeichert)"""
+        enabled = not self.settings["timelapse_enabled"]
+        get_settings_store().update({"timelapse_enabled": enabled})
+        if enabled:
+            self.start_timelapse()
+        else:
+            self.stop_timelapse()
+    
+    def start_replay(self):
+        """Starte den Replay-Puffer, falls er in den Einstellungen aktiviert ist"""
+        if self.settings["capture_mode"] != "replay" or ScreenshotTool.replay_buffer is not None:
+            return
+        ScreenshotTool.replay_buffer = ReplayBuffer(
+            self.grab_mouse_monitor,
+            fps=self.settings["replay_fps"],
+            seconds=self.settings["replay_seconds"],
+            memory_mb=self.settings["replay_memory_mb"],
+            compress=self.settings["replay_compress"]
+        )
+        ScreenshotTool.replay_buffer.start()
+    
+    def save_replay(self):
+        """Speichere die Frames aus dem Replay-Puffer"""
+        try:
+            latest_only = self.settings["replay_save"] == "latest"
+            frames = ScreenshotTool.replay_buffer.snapshot(latest_only=latest_only)
+            if not frames:
+                logger.warning("Replay buffer is empty, nothing to save")
+                return
+            logger.info(f"Saving {len(frames)} replay frame(s)...")
+            
+            pipeline = self.get_pipeline()
+            for frame in frames:
+                # The store adds the frame's own timestamp and a sequence number
+                frame.name = "replay"
+                pipeline.submit(frame)
+        except Exception as e:
+            logger.error(f"Error saving replay: {e}")
+    
+    def save_frame(self, frame):
+        """Kodiere und speichere ein Frame (läuft im Worker-Thread)"""
+        store = self.get_store()
+        
+        started = metrics.start()
+        frame.resolve()
+        metrics.stop("crop", started)
+        
+        delta = self.get_delta()
+        if delta is not None and delta.accepts(frame):
+            # Only the tiles that changed since the previous frame of this monitor are written
+            started = metrics.start()
+            save_path, size_bytes = delta.save(frame)
+            store.record(frame, save_path, size_bytes, "delta", None)
+            metrics.stop("delta", started)
+            logger.info(f"Screenshot saved as delta: {save_path}")
+            return
+        
+        # Hashing the raw pixels is much cheaper than encoding, a duplicate skips both encode and write
+        started = metrics.start()
+        fingerprint, existing = store.find_duplicate(frame)
+        metrics.stop("dedup", started)
+        if existing is not None:
+            save_path = store.save_duplicate(frame, existing)
+            if save_path is not None:
+                logger.info(f"Screenshot unchanged, linked to {existing}: {save_path}")
+                self.queue_thumbnail(frame, save_path)
+                return
+        
+        encoder = get_encoder(self.settings["encoder"])
+        
+        started = metrics.start()
+        buffer = io.BytesIO()
+        encoder.save(frame.image, buffer, self.settings["encoder_profile"], self.settings["encoder_options"])
+        metrics.stop("encode", started)
+        
+        started = metrics.start()
+        save_path = store.save(frame, buffer.getbuffer(), encoder.name, encoder.extension, fingerprint)
+        metrics.stop("write", started)
+        logger.info(f"Screenshot saved: {save_path}")
+        self.queue_thumbnail(frame, save_path)
+    
+    def get_delta(self):
+        """Hole den Delta-Speicher (None, wenn delta_mode aus ist)"""
+        if self.settings["delta_mode"] == "off":
+            return None
+        store = self.get_store()
+        with ScreenshotTool.pipeline_lock:
+            if ScreenshotTool.delta is None:
+                ScreenshotTool.delta = DeltaStore(
+                    store,
+                    mode=self.settings["delta_mode"],
+                    tile=self.settings["delta_tile"],
+                    keyframe_interval=self.settings["delta_keyframe_interval"]
+                )
+            return ScreenshotTool.delta
+    
+    def queue_thumbnail(self, frame, save_path):
+        """Erzeuge das Thumbnail im Hintergrund aus dem noch dekodierten Frame"""
+        thumbnails = self.get_thumbnails()
+        if thumbnails is not None:
+            thumbnails.submit(frame.image, save_path)
+    
+    def get_thumbnails(self):
+        """Hole den gemeinsamen Thumbnail-Cache (None, wenn Thumbnails aus sind)"""
+        if not self.settings["thumbnails_enabled"]:
+            return None
+        with ScreenshotTool.pipeline_lock:
+            if ScreenshotTool.thumbnails is not None:
+                return ScreenshotTool.thumbnails
+        with ScreenshotTool.thumbnails_lock:
+            if ScreenshotTool.thumbnails is None:
+                # Scans the whole .thumbnails tree, outside pipeline_lock
+                thumbnails = ThumbnailCache(
+                    self.settings["screenshot_path"],
+                    size=self.settings["thumbnail_size"],
+                    max_mb=self.settings["thumbnail_cache_mb"]
+                )
+                with ScreenshotTool.pipeline_lock:
+                    ScreenshotTool.thumbnails = thumbnails
+            return ScreenshotTool.thumbnails
+    
+    def thumbnail_for(self, path):
+        """Pfad des Thumbnails eines gespeicherten Screenshots"""
+        thumbnails = self.get_thumbnails()
+        if thumbnails is None:
+            raise ValueError("thumbnails are disabled")
+        return thumbnails.get(path)
+    
+    def get_store(self):
+        """Hole die gemeinsame Screenshot-Ablage für screenshot_path"""
+        with ScreenshotTool.pipeline_lock:
+            if ScreenshotTool.store is not None:
+                return ScreenshotTool.store
+        with ScreenshotTool.store_lock:
+            if ScreenshotTool.store is None:
+                # makedirs and catalog setup may hang on an unreachable share, outside pipeline_lock
+                store = ScreenshotStore(
+                    self.settings["screenshot_path"],
+                    retention_days=self.settings["retention_days"],
+                    retention_max_mb=self.settings["retention_max_mb"],
+                    dedup=self.settings["dedup"],
+                    dedup_threshold=self.settings["dedup_threshold"],
+                    dedup_index_size=self.settings["dedup_index_size"],
+                    durability=self.settings["durability"],
+                    group_files=self.settings["durability_group_files"],
+                    group_ms=self.settings["durability_group_ms"],
+                    spool_path=self.settings["spool_path"] or None,
+                    spool_slow_ms=self.settings["spool_slow_ms"],
+                    catalog_dir=catalog_dir(self.settings)
+                )
+                with ScreenshotTool.pipeline_lock:
+                    ScreenshotTool.store = store
+            return ScreenshotTool.store
+    
+    def find_screenshots(self, start=None, end=None, monitor=None, limit=None):
+        """Suche im Katalog nach Zeitraum und Monitor"""
+        return self.get_store().find(start, end, monitor, limit)
+    
+    def metrics_report(self):
+        """Sammle Metriken und Zähler für den metrics-Befehl"""
+        pipeline = ScreenshotTool.pipeline
+        return {
+            "enabled": metrics.is_enabled(),
+            "histograms": metrics.snapshot(),
+            "monitor_cache": ScreenshotTool.monitors.stats(),
+            "pipeline_dropped": pipeline.dropped if pipeline is not None else 0,
+            "dedup": ScreenshotTool.store.dedup.stats() if ScreenshotTool.store is not None else None,
+            "output": ScreenshotTool.store.writer.stats() if ScreenshotTool.store is not None else None,
+            "thumbnails": ScreenshotTool.thumbnails.stats() if ScreenshotTool.thumbnails is not None else None,
+            "delta": ScreenshotTool.delta.stats() if ScreenshotTool.delta is not None else None,
+            "strip_budget": ScreenshotTool.strip_budget.stats() if ScreenshotTool.strip_budget is not None else None,
+            "triggers": ScreenshotTool.trigger.stats() if ScreenshotTool.trigger is not None else None,
+            "timelapse": ScreenshotTool.timelapse.stats() if ScreenshotTool.timelapse is not None else None,
+        }
+    
+    def status(self):
+        """Kurzer Statusbericht für den status-Befehl"""
+        pipeline = ScreenshotTool.pipeline
+        replay = ScreenshotTool.replay_buffer
+        return {
+            "pid": os.getpid(),
+            "settings_file": os.path.abspath(get_settings_store().path),
+            "screenshot_path": os.path.abspath(self.settings["screenshot_path"]),
+            "capture_mode": self.settings["capture_mode"],
+            "encoder": f"{self.settings['encoder']}/{self.settings['encoder_profile']}",
+            "pipeline_pending": pipeline.pending if pipeline is not None else 0,
+            "replay_frames": len(replay) if replay is not None else None,
+        }
+    
+    def reload_settings(self):
+        """Lade die Einstellungen neu und übernimm die geänderten Schlüssel"""
+        changed = get_settings_store().reload()
+        logger.info("Settings reloaded!")
+        return sorted(changed)
+    
+    def flush_pipeline(self, timeout=None):
+        """Warte, bis alle eingereihten Screenshots gespeichert sind"""
+        if ScreenshotTool.pipeline is not None:
+            logger.info("Waiting for queued screenshots to be saved...")
+            ScreenshotTool.pipeline.shutdown(timeout=timeout)
+        if ScreenshotTool.store is not None:
+            # Group commit: the last batch is renamed and synced now instead of after group_ms
+            ScreenshotTool.store.writer.flush()
+        if ScreenshotTool.thumbnails is not None:
+            ScreenshotTool.thumbnails.flush(timeout=timeout)
+    
+    def open_settings_in_thread(self):
+        """Öffne das Einstellungsfenster, ohne den Aufrufer zu blockieren"""
+        threading.Thread(target=self.open_settings_window, daemon=True).start()
     
     def open_settings_window(self):
         """Öffne das Einstellungsfenster"""
@@ -190,6 +867,8 @@ class ScreenshotTool:
     
     def create_customtkinter_settings(self):
         """Erstelle Einstellungsfenster mit CustomTkinter"""
+        import customtkinter as ctk
+        
         ctk.set_appearance_mode("dark")
         ctk.set_default_color_theme("blue")
         
@@ -297,26 +976,41 @@ class ScreenshotTool:
         
         return image
     
-    def on_quit(self, icon, item):
+    def on_quit(self, icon=None, item=None):
         """Beende das Programm"""
         #print("Exiting...")
         logger.warning("Exiting...")
-        icon.stop()
+        if ScreenshotTool.replay_buffer is not None:
+            ScreenshotTool.replay_buffer.stop()
+        self.stop_timelapse()
+        self.flush_pipeline()
+        get_settings_store().flush()
+        logger.info(f"Monitor cache: {ScreenshotTool.monitors.stats()}")
+        if metrics.is_enabled():
+            logger.info(f"Metrics:\n{metrics.format_report()}")
+        if icon is not None:
+            icon.stop()
+        # os._exit skips atexit, so drain the log queue here
+        shutdown_logging()
         os._exit(0)
     
     def create_menu(self):
         """Erstelle das Tray-Menü"""
+        import pystray
         return pystray.Menu(
             pystray.MenuItem("Take Screenshot", lambda: self.take_screenshot()),
             pystray.MenuItem("Open Folder", lambda: self.open_folder()),
+            pystray.MenuItem("Timelapse", lambda: self.toggle_timelapse(),
+                             checked=lambda item: bool(self.settings["timelapse_enabled"])),
             pystray.Menu.SEPARATOR,
-            pystray.MenuItem("Settings", lambda: threading.Thread(target=self.open_settings_window, daemon=True).start()),
+            pystray.MenuItem("Settings", lambda: self.open_settings_in_thread()),
             pystray.Menu.SEPARATOR,
             pystray.MenuItem("Exit", self.on_quit)
         )
     
     def run_tray(self):
         """Starte das System Tray Icon"""
+        import pystray
         self.icon = pystray.Icon(
             "screenshot_tool",
             self.create_icon_image(),
@@ -325,113 +1019,162 @@ class ScreenshotTool:
         )
         self.icon.run()
     
-    def run(self):
+    def run(self, tray=True):
         """Starte das gesamte Programm"""
+        metrics.set_enabled(self.settings["metrics_enabled"])
+        store = get_settings_store()
+        store.subscribe(self.apply_settings_change)
+        store.start_watching()
         os.makedirs(self.settings["screenshot_path"], exist_ok=True)
         
         logger.info("Screenshot Tool started!")
         logger.info(f"Screenshot key: {self.settings['screenshot_key']}")
         logger.info(f"Open folder key: {self.settings['open_folder_key']}")
         logger.info("Check system tray for settings...")
+        self.start_replay()
+        self.start_timelapse()
         #print("Screenshot Tool started!")
         #print(f"Screenshot key: {self.settings['screenshot_key']}")
         #print(f"Open folder key: {self.settings['open_folder_key']}")
         #print("Check system tray for settings...")
         
+        metrics.stop("startup", STARTED)
+        if not tray:
+            return
+        threading.Thread(target=preload_modules, daemon=True).start()
         tray_thread = threading.Thread(target=self.run_tray, daemon=False)
         tray_thread.start()
         tray_thread.join()
 
-def ipc_server():
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.bind(("127.0.0.1", 50555))
-    s.listen(1)
+def preload_modules():
+    """Importiere Module, die erst beim ersten Screenshot gebraucht werden, im Hintergrund"""
+    for name in PRELOAD_MODULES:
+        try:
+            __import__(name)
+        except Exception as e:
+            logger.error(f"Error preloading {name}: {e}")
 
-    while True:
-        conn, _ = conn_info = s.accept()
-        msg = conn.recv(1024).decode()
-        if msg == "opened_app":
-            screenshot_tool = ScreenshotTool()
-            screenshot_tool.open_settings_window()
-            logger.warning("Opening settings because of external request!")
-            #pass
-        conn.close()
+def ipc_server(tool, sock=None):
+    try:
+        IPCServer(tool, sock=sock).serve_forever()
+    except Exception as e:
+        logger.error(f"IPC server stopped: {e}")
 
 
 def notify_existing_instance():
     try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.connect(("127.0.0.1", 50555))
-        s.send(b"opened_app")
-        s.close()
-        return True
-    except ConnectionRefusedError:
+        response = send_command("open_settings")
+    except (ConnectionRefusedError, FileNotFoundError):
+        # No token: the port belongs to another user's instance
         return False
+    return bool(response and response.get("ok"))
 
 def define_logger(title=None):
     global logger
 
-    tool = ScreenshotTool()
-    data = tool.load_settings()
-    if title == None:
-        LATEST_LOG = os.path.join(data["logs_path"], "latest.log")
-    else:
-        LATEST_LOG = os.path.join(data["logs_path"], f"{title}.log")
-    os.makedirs(data["logs_path"], exist_ok=True)
-
-    # If latest.log exists, rename it with last modified time
-    if title == None:
-        if os.path.exists(LATEST_LOG):
-            mtime = os.path.getmtime(LATEST_LOG)
-            timestamp = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d_%H-%M-%S")
-            archived_log = os.path.join(data["logs_path"], f"{timestamp}.log")
-            os.rename(LATEST_LOG, archived_log)
-
-    # Configure logging
-    logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    handlers=[
-        logging.FileHandler(LATEST_LOG),
-        logging.StreamHandler()  # still prints to console
-    ]
+    data = get_settings_store().data
+    # Callers only enqueue records, a background listener does the file and console I/O
+    logger = configure_logging(
+        data["logs_path"],
+        filename="latest.log" if title == None else f"{title}.log",
+        # If latest.log exists, it is archived under its last modified time
+        archive_existing=title == None,
+        level=data["log_level"],
+        log_format=data["log_format"],
+        max_bytes=data["log_max_mb"] * 1024 * 1024,
+        rotate_seconds=data["log_rotate_hours"] * 60 * 60,
+        retention=data["log_retention"],
+        console=data["log_console"]
     )
-
-    logger = logging.getLogger("PySSUtil")
     logger.debug("Logger started!")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Screenshot Tool")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report the time spent in each startup phase and exit")
+    parser.add_argument("--profile-output", default=None,
+                        help="also write the startup profile as JSON to this file")
+    parser.add_argument("--thumbnails", metavar="DIR", default=None,
+                        help="create missing thumbnails for an existing screenshot folder and exit")
+    parser.add_argument("--reencode", metavar="DIR", default=None,
+                        help="re-encode an existing screenshot folder losslessly and exit (resumable)")
+    parser.add_argument("--encoder", default=None,
+                        help="encoder for --reencode (default: the encoder setting)")
+    parser.add_argument("--profile", default=None,
+                        help="encoder profile for --reencode (default: smallest)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes for --thumbnails and --reencode (default: all cores)")
+    parser.add_argument("--export-delta", metavar="SEGMENT", default=None,
+                        help="write every frame of a .tdelta segment as PNG and exit")
+    parser.add_argument("--output", default=None,
+                        help="output folder for --export-delta (default: next to the segment)")
+    parser.add_argument("--daemon", action="store_true",
+                        help="run without tray and hotkeys, captures are triggered over IPC (e.g. by linux.py)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    # --reencode and --thumbnails run process pools; in the frozen exe the workers start this
+    # script again and must be handed to multiprocessing before any argument parsing
+    import multiprocessing
+    multiprocessing.freeze_support()
     try:
+        args = parse_args()
+        profile = metrics.PhaseTimer(STARTED)
+        profile.mark("imports")
         logger_messages = []
         print(os.getenv("pyscreenshotutil_config"))
         if os.getenv("pyscreenshotutil_config"):
             SETTINGS_FILE = os.getenv("pyscreenshotutil_config")
         logger_messages.append((f"Settingsfile configured: {SETTINGS_FILE}", logging.DEBUG))
-        def is_running(exe_name):
-            exe_name = exe_name.lower()
-            current_pid = os.getpid()
-            for proc in psutil.process_iter(['pid', 'name']):
-                try:
-                    if proc.pid == current_pid:
-                        continue  # skip this process itself
-                    if proc.info['name'] and proc.info['name'].lower() == exe_name:
-                        return True
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-            return False
+        if args.thumbnails:
+            # One-off maintenance run, does not need the instance lock
+            data = get_settings_store().data
+            result = backfill_thumbnails(args.thumbnails, data["thumbnail_size"], data["thumbnail_cache_mb"], args.workers)
+            print(f"{result['created']} of {result['images']} thumbnail(s) created, {result['failed']} failed, "
+                  f"{result['seconds']:.1f}s, cache {result['cache_bytes'] / 1024 / 1024:.1f} MB")
+            sys.exit(1 if result["failed"] else 0)
+        if args.export_delta:
+            written = export_segment(args.export_delta, args.output)
+            print(f"{len(written)} frame(s) written to {os.path.dirname(written[0]) if written else args.output}")
+            sys.exit(0)
+        if args.reencode:
+            from reencode import reencode
+            data = get_settings_store().data
+            # The tool is not running here: log to reencode.log and the console, latest.log stays as it is
+            logger = configure_logging(data["logs_path"], filename="reencode.log", archive_existing=False, console=True)
+            catalog = None
+            if catalog_dir(data) and os.path.abspath(args.reencode) == os.path.abspath(data["screenshot_path"]):
+                from storage import CATALOG_FILE
+                catalog = os.path.join(catalog_dir(data), CATALOG_FILE)
+            result = reencode(args.reencode, args.encoder or data["encoder"], args.profile or "smallest",
+                              data["encoder_options"] if not args.encoder else None, args.workers, catalog=catalog)
+            print(f"{result['files']} file(s), {result['replaced']} replaced, {result['not_smaller']} not smaller, "
+                  f"{result['not_lossless']} not lossless, {result['linked']} hardlinked, {result['failed']} failed")
+            print(f"{result['bytes_saved'] / 1024 / 1024:.1f} MB saved "
+                  f"({result['bytes_before'] / 1024 / 1024:.1f} -> {result['bytes_after'] / 1024 / 1024:.1f} MB), "
+                  f"{result['files_per_s']:.1f} files/s, "
+                  f"{result['bytes_before'] / 1024 / 1024 / result['seconds'] if result['seconds'] else 0:.1f} MB/s")
+            shutdown_logging()
+            sys.exit(1 if result["failed"] else 0)
         check_quit = False
-        if is_running(EXENAME):
-            logger_messages.append((F"Error while starting program: An instance of {EXENAME} has been detected. This instance is closing now!", logging.ERROR))
+        # Binding the IPC port is the instance lock: if it is taken, hand off to the owner
+        instance_socket = acquire_instance_socket()
+        if instance_socket is None:
+            logger_messages.append(("Error while starting program: Another instance is already running. This instance is closing now!", logging.ERROR))
             #messagebox.showerror("Error while starting program!", f"An instance of {EXENAME} has been detected. Please close out of the old instance to satrt a new one!")
             if notify_existing_instance():
                 pass
             else:
                 logger_messages.append(("Error while trying to contact the already running program", logging.ERROR))
+                from tkinter import messagebox
                 messagebox.showerror("Error", "Error while trying to contact the already running program")
             check_quit = True
+        profile.mark("instance_check")
 
+        get_settings_store()
+        profile.mark("settings")
         if check_quit == True:
-            define_logger(title=f"{datetime.now().strftime("%Y-%m-%d_%H-%M-%S")}_error")
+            define_logger(title=f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_error")
         else:
             define_logger()
         for msg in logger_messages:
@@ -439,10 +1182,34 @@ if __name__ == "__main__":
         if check_quit == True:
             logger.warning("Exiting...")
             sys.exit(1)
-        threading.Thread(target=ipc_server, daemon=True).start()
-        hotkeys = HotkeyManager()
-        hotkeys.start()
+        profile.mark("logger")
         tool = ScreenshotTool()
+        threading.Thread(target=ipc_server, args=(tool, instance_socket), daemon=True).start()
+        profile.mark("ipc")
+        if args.daemon:
+            # Hotkeys belong to the compositor here, it runs linux.py which talks to us over IPC
+            tool.run(tray=False)
+            logger.info(f"Running as daemon, waiting for IPC requests on {IPC_HOST}:{IPC_PORT}")
+            import signal
+            stop_requested = threading.Event()
+            # systemctl stop and the compositor end the daemon with SIGTERM, without this the
+            # queued frames, the pending group commit and the log queue would be lost
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda signum, frame: stop_requested.set())
+            stop_requested.wait()
+            logger.info("Received signal, draining before exit")
+            tool.on_quit()
+        hotkeys = HotkeyManager(tool)
+        hotkeys.start()
+        profile.mark("hotkeys")
+        if args.profile_startup:
+            tool.run(tray=False)
+            profile.mark("run")
+            logger.info(f"Startup profile:\n{profile.report()}")
+            if args.profile_output:
+                with open(args.profile_output, "w") as f:
+                    json.dump(profile.as_dict(), f, indent=4)
+            tool.on_quit()
         tool.run()
     except KeyboardInterrupt:
         #logger.warning("Exiting...")
@@ -453,4 +1220,4 @@ if __name__ == "__main__":
         define_logger()
         logger.error(f"Error: {e}")
         #print(f"Error: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
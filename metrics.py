@@ -0,0 +1,129 @@
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+# Upper bucket bounds in seconds, the last bucket catches everything above
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_enabled = True
+_histograms = {}
+_registry_lock = threading.Lock()
+
+
+class Histogram:
+    """Latenz-Histogramm mit festen Buckets (keine Allokation pro Messung)"""
+    __slots__ = ("name", "bounds", "counts", "count", "total", "max", "lock")
+
+    def __init__(self, name, bounds=DEFAULT_BUCKETS):
+        self.name = name
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, pct):
+        """Obergrenze des Buckets, in dem das Perzentil liegt"""
+        if self.count == 0:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "count": self.count,
+                "sum": self.total,
+                "max": self.max,
+                "p50": self.percentile(50),
+                "p95": self.percentile(95),
+                "p99": self.percentile(99),
+                "buckets": dict(zip([str(b) for b in self.bounds] + ["inf"], self.counts)),
+            }
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled():
+    return _enabled
+
+
+def histogram(name):
+    """Hole (oder registriere einmalig) das Histogramm für eine Stufe"""
+    hist = _histograms.get(name)
+    if hist is None:
+        with _registry_lock:
+            hist = _histograms.setdefault(name, Histogram(name))
+    return hist
+
+
+def start():
+    """Startzeitpunkt einer Messung (0, wenn Metriken aus sind)"""
+    return perf_counter() if _enabled else 0
+
+
+def stop(name, started):
+    """Beende eine mit start() begonnene Messung"""
+    if not started or not _enabled:
+        return
+    histogram(name).observe(perf_counter() - started)
+
+
+def snapshot():
+    return {name: hist.snapshot() for name, hist in sorted(_histograms.items())}
+
+
+def format_report():
+    """Kompakte Textzusammenfassung für das Log"""
+    lines = []
+    for name, data in snapshot().items():
+        if data["count"]:
+            lines.append(
+                f"{name}: n={data['count']} avg={data['sum'] / data['count'] * 1000:.1f}ms "
+                f"p50<={data['p50'] * 1000:.1f}ms p95<={data['p95'] * 1000:.1f}ms "
+                f"p99<={data['p99'] * 1000:.1f}ms max={data['max'] * 1000:.1f}ms"
+            )
+    return "\n".join(lines) if lines else "no samples"
+
+
+class PhaseTimer:
+    """Misst aufeinanderfolgende Phasen, z.B. beim Programmstart"""
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else perf_counter()
+        self.last = self.started
+        self.phases = []
+
+    def mark(self, name):
+        now = perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def total(self):
+        return self.last - self.started
+
+    def as_dict(self):
+        return {"phases": dict(self.phases), "total": self.total()}
+
+    def report(self):
+        lines = [f"{name:16} {seconds * 1000:8.1f} ms" for name, seconds in self.phases]
+        lines.append(f"{'total':16} {self.total() * 1000:8.1f} ms")
+        return "\n".join(lines)
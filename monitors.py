@@ -0,0 +1,140 @@
+import logging
+import sys
+import threading
+import time
+
+logger = logging.getLogger("PySSUtil")
+
+GRID_CELL = 256        # pixels per index cell
+FALLBACK_TTL = 5       # seconds, used where no cheap fingerprint is available
+
+# GetSystemMetrics indices
+SM_XVIRTUALSCREEN = 76
+SM_YVIRTUALSCREEN = 77
+SM_CXVIRTUALSCREEN = 78
+SM_CYVIRTUALSCREEN = 79
+SM_CMONITORS = 80
+
+
+def enumerate_monitors():
+    """Frage die Monitore bei screeninfo ab (langsam, deshalb zwischengespeichert)"""
+    from screeninfo import get_monitors
+    return get_monitors()
+
+
+def display_fingerprint():
+    """Billiger Fingerabdruck der Monitor-Anordnung (None, wenn nicht verfügbar)"""
+    if sys.platform != "win32":
+        return None
+    import ctypes
+    from ctypes import wintypes
+    metrics = ctypes.windll.user32.GetSystemMetrics
+    rects = []
+    MONITORENUMPROC = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HMONITOR, wintypes.HDC,
+                                         ctypes.POINTER(wintypes.RECT), wintypes.LPARAM)
+
+    def collect(monitor, dc, rect, data):
+        r = rect.contents
+        rects.append((r.left, r.top, r.right, r.bottom))
+        return True
+
+    # Count and bounding box stay the same when two monitors of different sizes swap
+    # sides, so every monitor's own rectangle is part of the fingerprint
+    if not ctypes.windll.user32.EnumDisplayMonitors(None, None, MONITORENUMPROC(collect), 0):
+        return None
+    return (
+        metrics(SM_CMONITORS),
+        metrics(SM_XVIRTUALSCREEN),
+        metrics(SM_YVIRTUALSCREEN),
+        metrics(SM_CXVIRTUALSCREEN),
+        metrics(SM_CYVIRTUALSCREEN),
+        tuple(sorted(rects)),
+    )
+
+
+class MonitorTopology:
+    """Zwischengespeicherte Monitor-Anordnung mit Gitter-Index für Punktabfragen"""
+
+    def __init__(self, enumerate_monitors=enumerate_monitors, fingerprint=display_fingerprint, ttl=FALLBACK_TTL):
+        self.enumerate_monitors = enumerate_monitors
+        self.fingerprint = fingerprint
+        self.ttl = ttl
+
+        self.monitors = []
+        self.grid = {}
+        self.built_fingerprint = None
+        self.built_at = None
+
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.outside = 0
+        self.lock = threading.Lock()
+
+    def invalidate(self):
+        """Verwirf den Cache, z.B. nach einer Display-Änderung"""
+        with self.lock:
+            self.built_at = None
+
+    def get_monitors(self):
+        """Liefere die (zwischengespeicherte) Monitorliste"""
+        with self.lock:
+            self._ensure_current()
+            return list(self.monitors)
+
+    def lookup(self, x, y):
+        """Finde den Monitor, der den Punkt (x, y) enthält"""
+        with self.lock:
+            self._ensure_current()
+            for monitor in self.grid.get((x // GRID_CELL, y // GRID_CELL), ()):
+                if (monitor.x <= x < monitor.x + monitor.width and
+                        monitor.y <= y < monitor.y + monitor.height):
+                    return monitor
+            # Cursor in a gap between monitors, same fallback as before
+            self.outside += 1
+            return self.monitors[0]
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "rebuilds": self.rebuilds,
+            "outside": self.outside,
+            "monitors": len(self.monitors),
+        }
+
+    def _ensure_current(self):
+        if self.built_at is not None:
+            if self.built_fingerprint is not None:
+                current = self.fingerprint()
+                if current == self.built_fingerprint:
+                    self.hits += 1
+                    return
+                logger.info("Display configuration changed, rebuilding monitor cache")
+            elif time.monotonic() - self.built_at < self.ttl:
+                self.hits += 1
+                return
+        self.misses += 1
+        self._rebuild()
+
+    def _rebuild(self):
+        # Taken before enumerating, so a change during enumeration triggers another rebuild
+        fingerprint = self.fingerprint()
+        monitors = self.enumerate_monitors()
+        if not monitors:
+            raise RuntimeError("No monitors found")
+
+        grid = {}
+        for monitor in monitors:
+            x0, y0 = monitor.x // GRID_CELL, monitor.y // GRID_CELL
+            x1 = (monitor.x + monitor.width - 1) // GRID_CELL
+            y1 = (monitor.y + monitor.height - 1) // GRID_CELL
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    grid.setdefault((cx, cy), []).append(monitor)
+
+        self.monitors = monitors
+        self.grid = grid
+        self.built_fingerprint = fingerprint
+        self.built_at = time.monotonic()
+        self.rebuilds += 1
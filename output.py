@@ -0,0 +1,288 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger("PySSUtil")
+
+DURABILITY_NONE = "none"     # rename only, the OS writes back whenever it likes
+DURABILITY_FILE = "file"     # fsync every file (and its directory) before it counts as saved
+DURABILITY_GROUP = "group"   # fsync in batches of N files or every T ms, files appear at commit
+DURABILITIES = (DURABILITY_NONE, DURABILITY_FILE, DURABILITY_GROUP)
+
+SPOOL_RETRY = 5.0       # seconds between attempts to reach an unavailable target
+SPOOL_COOLDOWN = 30.0   # seconds to keep spooling after the target was slow or failed
+
+
+def fsync_dir(directory):
+    """Mache Umbenennungen in einem Verzeichnis dauerhaft (unter Windows nicht möglich)"""
+    if sys.platform == "win32":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class AtomicWriter:
+    """Schreibt in eine temporäre Datei im Zielordner und benennt sie atomar um"""
+
+    def __init__(self, durability=DURABILITY_FILE, group_files=16, group_ms=200, spool_path=None, slow_ms=1000):
+        if durability not in DURABILITIES:
+            logger.warning(f"Unknown durability '{durability}', using '{DURABILITY_FILE}'")
+            durability = DURABILITY_FILE
+        self.durability = durability
+        self.group_files = max(1, group_files)
+        self.group_seconds = max(1, group_ms) / 1000
+        self.slow_seconds = slow_ms / 1000 if slow_ms else None
+        self.known_dirs = set()
+        self.pending = []          # (file, tmp path, final path) waiting for the group commit
+        self.condition = threading.Condition()
+        self.closed = False
+        self.commits = 0
+        self.committed = 0
+
+        self.committer = None
+        if durability == DURABILITY_GROUP:
+            self.committer = threading.Thread(target=self._commit_loop, name="group-commit", daemon=True)
+            self.committer.start()
+        self.spool = Spool(spool_path, self) if spool_path else None
+
+    def ensure_dir(self, directory):
+        # One makedirs per directory per process instead of one per shot
+        if directory not in self.known_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self.known_dirs.add(directory)
+
+    def write(self, path, data):
+        """Schreibe data nach path; ist das Ziel langsam oder weg, zuerst in den lokalen Spool"""
+        if self.spool is not None and self.spool.active():
+            self.spool.put(path, data)
+            return
+        started = time.monotonic()
+        try:
+            with self.open(path) as f:
+                f.write(data)
+        except OSError as e:
+            if self.spool is None:
+                raise
+            logger.warning(f"Error writing {path} ({e}), spooling locally until the target is back")
+            self.spool.activate()
+            self.spool.put(path, data)
+            return
+        elapsed = time.monotonic() - started
+        if self.spool is not None and self.slow_seconds and elapsed > self.slow_seconds:
+            logger.warning(f"Writing {path} took {elapsed * 1000:.0f} ms, spooling locally for a while")
+            self.spool.activate()
+
+    @contextmanager
+    def open(self, path, sync=False):
+        """Datei-Objekt für path; erst nach erfolgreichem Schließen taucht path auf
+
+        sync forces an fsync even with durability "none", for data that exists nowhere else.
+        """
+        directory = os.path.dirname(path) or "."
+        self.ensure_dir(directory)
+        tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            f = open(tmp_path, "wb")
+        except FileNotFoundError:
+            # The cached directory was removed (pruned shard, remounted share), create it again
+            self.known_dirs.discard(directory)
+            self.ensure_dir(directory)
+            f = open(tmp_path, "wb")
+        try:
+            yield f
+        except BaseException:
+            f.close()
+            os.remove(tmp_path)
+            raise
+        self._finish(f, tmp_path, path, sync)
+
+    def _finish(self, f, tmp_path, path, sync=False):
+        if self.durability == DURABILITY_GROUP and not sync:
+            f.flush()
+            with self.condition:
+                self.pending.append((f, tmp_path, path))
+                if len(self.pending) >= self.group_files:
+                    self.condition.notify_all()
+            return
+        sync = sync or self.durability == DURABILITY_FILE
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+        f.close()
+        os.replace(tmp_path, path)
+        if sync:
+            fsync_dir(os.path.dirname(path) or ".")
+
+    def in_flight(self, path):
+        """True, wenn path geschrieben, aber noch nicht am Ziel sichtbar ist"""
+        with self.condition:
+            if any(pending_path == path for _, _, pending_path in self.pending):
+                return True
+        return self.spool is not None and self.spool.holds(path)
+
+    def commit(self):
+        """fsync und Umbenennung aller wartenden Dateien, ein fsync pro Verzeichnis"""
+        with self.condition:
+            batch, self.pending = self.pending, []
+        if not batch:
+            return 0
+        directories = set()
+        for f, tmp_path, path in batch:
+            try:
+                os.fsync(f.fileno())
+                f.close()
+                os.replace(tmp_path, path)
+                directories.add(os.path.dirname(path) or ".")
+            except OSError as e:
+                logger.error(f"Error committing {path}: {e}")
+                f.close()
+        for directory in directories:
+            try:
+                fsync_dir(directory)
+            except OSError as e:
+                logger.error(f"Error syncing directory {directory}: {e}")
+        self.commits += 1
+        self.committed += len(batch)
+        return len(batch)
+
+    def _commit_loop(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.closed or len(self.pending) >= self.group_files,
+                                        timeout=self.group_seconds)
+                closed = self.closed
+            self.commit()
+            if closed:
+                return
+
+    def flush(self):
+        self.commit()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.committer is not None:
+            self.committer.join(timeout=5)
+        self.commit()
+        if self.spool is not None:
+            self.spool.stop()
+
+    def stats(self):
+        stats = {"durability": self.durability, "pending": len(self.pending),
+                 "commits": self.commits, "committed": self.committed}
+        if self.spool is not None:
+            stats["spool"] = self.spool.stats()
+        return stats
+
+
+class Spool:
+    """Lokaler Zwischenspeicher für ein langsames oder fehlendes Ziel, wird im Hintergrund nachgeschoben"""
+
+    def __init__(self, path, writer, retry=SPOOL_RETRY, cooldown=SPOOL_COOLDOWN):
+        self.path = path
+        self.writer = writer
+        self.retry = retry
+        self.cooldown = cooldown
+        self.until = 0.0
+        self.targets = set()      # final paths still waiting in the spool
+        self.synced = 0
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stop_event = threading.Event()
+        os.makedirs(path, exist_ok=True)
+        # Entries left over from a previous run are synced like new ones
+        for name in self._entries():
+            try:
+                self.targets.add(self._target(os.path.join(path, name)))
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Error reading spooled entry {name}: {e}")
+        self.thread = threading.Thread(target=self._sync_loop, name="spool-sync", daemon=True)
+        self.thread.start()
+        if self.targets:
+            logger.info(f"Found {len(self.targets)} spooled screenshot(s) from a previous run")
+            self.wake.set()
+
+    def active(self):
+        # While a backlog exists new files queue behind it, so the target is not hit twice as hard
+        return time.monotonic() < self.until or bool(self.targets)
+
+    def holds(self, target):
+        return os.path.abspath(target) in self.targets
+
+    def activate(self):
+        self.until = time.monotonic() + self.cooldown
+
+    def put(self, target, data):
+        base = os.path.join(self.path, f"{time.time_ns()}_{uuid.uuid4().hex[:8]}")
+        # Once put() returns, the spool holds the only copy: both files are synced, the
+        # header last, so a .json only ever sits next to a complete .data
+        with open(base + ".data", "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        with open(base + ".json", "w") as f:
+            json.dump({"target": os.path.abspath(target)}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        fsync_dir(self.path)
+        with self.lock:
+            self.targets.add(os.path.abspath(target))
+        self.wake.set()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake.set()
+
+    def stats(self):
+        return {"active": self.active(), "backlog": len(self.targets), "synced": self.synced}
+
+    def _entries(self):
+        return sorted(name[:-5] for name in os.listdir(self.path) if name.endswith(".json"))
+
+    def _target(self, base):
+        with open(base + ".json", "r") as f:
+            return json.load(f)["target"]
+
+    def _sync_loop(self):
+        while not self.stop_event.is_set():
+            self.wake.wait(timeout=self.retry)
+            self.wake.clear()
+            if not self.targets:
+                continue
+            for name in self._entries():
+                if self.stop_event.is_set():
+                    return
+                base = os.path.join(self.path, name)
+                try:
+                    target = self._target(base)
+                    with open(base + ".data", "rb") as f:
+                        data = f.read()
+                except (OSError, ValueError, KeyError) as e:
+                    # Torn entry from a crash between the two files, the shot is lost either way
+                    logger.error(f"Dropping unreadable spooled entry {name}: {e}")
+                    for suffix in (".json", ".data"):
+                        if os.path.exists(base + suffix):
+                            os.remove(base + suffix)
+                    continue
+                try:
+                    # Synced on the target right away (not left to the group commit): the spool
+                    # entry is deleted next, and until then it is the only durable copy
+                    with self.writer.open(target, sync=True) as out:
+                        out.write(data)
+                except OSError as e:
+                    logger.warning(f"Target still unavailable, keeping {len(self.targets)} spooled screenshot(s): {e}")
+                    break
+                os.remove(base + ".json")
+                os.remove(base + ".data")
+                with self.lock:
+                    self.targets.discard(target)
+                    self.synced += 1
@@ -0,0 +1,240 @@
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+
+from PIL import Image
+
+logger = logging.getLogger("PySSUtil")
+
+BACKPRESSURE_BLOCK = "block"
+BACKPRESSURE_DROP_OLDEST = "drop_oldest"
+BACKPRESSURE_SPILL = "spill"
+BACKPRESSURE_POLICIES = (BACKPRESSURE_BLOCK, BACKPRESSURE_DROP_OLDEST, BACKPRESSURE_SPILL)
+
+SPILL_DIR = "spill"
+
+_STOP = object()
+_WAKE = object()
+
+
+class Frame:
+    """Ein gegrabbtes Bild mit den Metadaten, die zum Speichern gebraucht werden"""
+    __slots__ = ("image", "captured_at", "monitor", "name", "crop")
+
+    def __init__(self, image, captured_at=None, monitor=None, name=None, crop=None):
+        self.image = image
+        self.captured_at = captured_at or datetime.now()
+        # monitor is a plain dict (x, y, width, height, name) so it survives spilling
+        self.monitor = monitor
+        # Optional file name stem, otherwise the timestamp based default is used
+        self.name = name
+        # Box (left, top, right, bottom) within image, cut out on the worker by resolve()
+        self.crop = crop
+
+    def resolve(self):
+        """Schneide den Bereich aus, falls das Frame nur auf ein größeres Bild zeigt"""
+        if self.crop is not None:
+            self.image = self.image.crop(self.crop)
+            self.crop = None
+        return self.image
+
+
+def monitor_info(monitor):
+    """Wandle einen screeninfo-Monitor in ein einfaches Dict um"""
+    if monitor is None:
+        return None
+    return {
+        "x": monitor.x,
+        "y": monitor.y,
+        "width": monitor.width,
+        "height": monitor.height,
+        "name": getattr(monitor, "name", None),
+    }
+
+
+class CapturePipeline:
+    """Kodiert und schreibt Screenshots in einem Worker-Pool hinter einer begrenzten Queue"""
+
+    def __init__(self, handler, workers=2, queue_size=8, backpressure=BACKPRESSURE_BLOCK, spill_path=SPILL_DIR):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            logger.warning(f"Unknown backpressure policy '{backpressure}', using '{BACKPRESSURE_BLOCK}'")
+            backpressure = BACKPRESSURE_BLOCK
+
+        self.handler = handler
+        self.backpressure = backpressure
+        self.spill_path = spill_path
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.spilled = deque()
+        self.dropped = 0
+
+        self._pending = 0
+        self._pending_cond = threading.Condition()
+        self._closed = False
+        self._workers = []
+        for i in range(max(1, workers)):
+            thread = threading.Thread(target=self._worker_loop, name=f"capture-worker-{i}", daemon=True)
+            thread.start()
+            self._workers.append(thread)
+
+        # Frames spilled by a previous run that never got encoded
+        self._recover_spill()
+
+    def submit(self, frame):
+        """Übergib ein Frame an den Worker-Pool (wird vom Hotkey-Thread aufgerufen)"""
+        if self._closed:
+            logger.error("Capture pipeline is shut down, frame discarded")
+            return False
+
+        self._add_pending(1)
+        if self.backpressure == BACKPRESSURE_BLOCK:
+            self.queue.put(frame)
+            return True
+
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            pass
+
+        if self.backpressure == BACKPRESSURE_SPILL:
+            try:
+                self._spill(frame)
+                return True
+            except Exception as e:
+                logger.error(f"Error spilling frame to disk: {e}")
+                # fall through and make room instead of losing the newest shot
+
+        while True:
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.dropped += 1
+                self._add_pending(-1)
+                logger.warning("Capture queue full, dropped oldest frame")
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(frame)
+                return True
+            except queue.Full:
+                continue
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def flush(self, timeout=None):
+        """Warte, bis alle eingereihten und ausgelagerten Frames geschrieben sind"""
+        with self._pending_cond:
+            return self._pending_cond.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def shutdown(self, timeout=None):
+        """Leere die Queue und beende die Worker"""
+        if self._closed:
+            return True
+        drained = self.flush(timeout=timeout)
+        if not drained:
+            logger.error(f"Capture pipeline shutdown timed out with {self._pending} frame(s) pending")
+        self._closed = True
+        for _ in self._workers:
+            self.queue.put(_STOP)
+        for thread in self._workers:
+            thread.join(timeout=timeout)
+        return drained
+
+    def _add_pending(self, count):
+        with self._pending_cond:
+            self._pending += count
+            if self._pending == 0:
+                self._pending_cond.notify_all()
+
+    def _worker_loop(self):
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                # Queue is empty, so this is the moment to pick up spilled frames
+                path = self._pop_spilled()
+                if path is not None:
+                    self._process_spilled(path)
+                    continue
+                item = self.queue.get()
+
+            if item is _STOP:
+                self.queue.task_done()
+                return
+            if item is _WAKE:
+                self.queue.task_done()
+                self._add_pending(-1)
+                continue
+            try:
+                self.handler(item)
+            except Exception as e:
+                logger.error(f"Error saving screenshot: {e}")
+            finally:
+                self.queue.task_done()
+                self._add_pending(-1)
+
+    def _pop_spilled(self):
+        try:
+            return self.spilled.popleft()
+        except IndexError:
+            return None
+
+    def _spill(self, frame):
+        # Spill only the monitor's pixels, not the whole desktop it points into
+        frame.resolve()
+        os.makedirs(self.spill_path, exist_ok=True)
+        base = os.path.join(self.spill_path, f"{frame.captured_at.strftime('%Y-%m-%d_%H-%M-%S-%f')}_{uuid.uuid4().hex[:8]}")
+        header = {
+            "mode": frame.image.mode,
+            "size": frame.image.size,
+            "captured_at": frame.captured_at.isoformat(),
+            "monitor": frame.monitor,
+            "name": frame.name,
+        }
+        with open(base + ".raw", "wb") as f:
+            f.write(frame.image.tobytes())
+        # The header is written last, so a .json only ever sits next to a complete .raw
+        with open(base + ".json", "w") as f:
+            json.dump(header, f)
+        self.spilled.append(base)
+        logger.warning(f"Capture queue full, spilled frame to {base}.raw")
+
+    def _load_spilled(self, base):
+        with open(base + ".json", "r") as f:
+            header = json.load(f)
+        with open(base + ".raw", "rb") as f:
+            image = Image.frombytes(header["mode"], tuple(header["size"]), f.read())
+        return Frame(image, datetime.fromisoformat(header["captured_at"]), header.get("monitor"), header.get("name"))
+
+    def _process_spilled(self, base):
+        try:
+            frame = self._load_spilled(base)
+            self.handler(frame)
+            for ext in (".json", ".raw"):
+                os.remove(base + ext)
+        except Exception as e:
+            logger.error(f"Error saving spilled frame {base}: {e}")
+        finally:
+            self._add_pending(-1)
+
+    def _recover_spill(self):
+        if not os.path.isdir(self.spill_path):
+            return
+        for name in sorted(os.listdir(self.spill_path)):
+            if name.endswith(".json"):
+                base = os.path.join(self.spill_path, name[:-5])
+                if os.path.exists(base + ".raw"):
+                    self._add_pending(1)
+                    self.spilled.append(base)
+        if self.spilled:
+            logger.info(f"Recovered {len(self.spilled)} spilled frame(s) from a previous run")
+            # Wake an idle worker so recovered frames don't wait for the next capture
+            self._add_pending(1)
+            self.queue.put(_WAKE)
@@ -0,0 +1,216 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from collections import deque
+
+from PIL import Image
+
+from encoders import get_encoder
+from thumbnails import IMAGE_EXTENSIONS, SKIP_DIRS
+
+logger = logging.getLogger("PySSUtil")
+
+CHECKPOINT_FILE = ".reencode-checkpoint.json"
+CHECKPOINT_EVERY = 50   # completed files between checkpoint writes
+IN_FLIGHT_PER_WORKER = 2
+
+REPLACED = "replaced"
+NOT_SMALLER = "not_smaller"
+NOT_LOSSLESS = "not_lossless"
+LINKED = "linked"
+FAILED = "failed"
+
+
+def scan(root):
+    """Liefere Bilddateien in fester Reihenfolge (sortiert, Tiefensuche), ohne das Archiv aufzulisten"""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            logger.error(f"Error scanning {directory}: {e}")
+            continue
+        # Only one directory listing is held at a time, plus the pending siblings on the stack
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SKIP_DIRS:
+                    subdirs.append(entry.path)
+            elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                yield entry.path
+        stack.extend(reversed(subdirs))
+
+
+def order_key(root, path):
+    # Matches the scan order: files of a directory first, then its subdirectories, by name
+    parts = os.path.relpath(path, root).split(os.sep)
+    return tuple((1, part) for part in parts[:-1]) + ((0, parts[-1]),)
+
+
+def reencode_file(path, encoder_name, profile, options):
+    """Kodiere eine Datei neu, prüfe verlustfrei und ersetze sie atomar (läuft im Prozess-Pool)"""
+    try:
+        if os.stat(path).st_nlink > 1:
+            # Deduplicated shots share the file, replacing one link would store the pixels twice
+            return path, path, 0, 0, LINKED, None
+        old_size = os.path.getsize(path)
+        encoder = get_encoder(encoder_name)
+        with Image.open(path) as original:
+            original.load()
+            buffer = io.BytesIO()
+            encoder.save(original, buffer, profile, options)
+            new_size = buffer.getbuffer().nbytes
+            if new_size >= old_size:
+                return path, path, old_size, old_size, NOT_SMALLER, None
+            buffer.seek(0)
+            with Image.open(buffer) as decoded:
+                if decoded.size != original.size or decoded.convert(original.mode).tobytes() != original.tobytes():
+                    return path, path, old_size, old_size, NOT_LOSSLESS, None
+
+        target = os.path.splitext(path)[0] + encoder.extension
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(buffer.getbuffer())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        if target != path:
+            # The new file is in place before the old one goes away
+            os.remove(path)
+        digest = hashlib.blake2b(buffer.getbuffer(), digest_size=16).hexdigest()
+        return path, target, old_size, new_size, REPLACED, digest
+    except Exception as e:
+        return path, path, 0, 0, FAILED, str(e)
+
+
+def load_checkpoint(path, job):
+    try:
+        with open(path, "r") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if checkpoint.get("job") != job:
+        logger.info("Checkpoint belongs to different settings, starting over")
+        return None
+    if not checkpoint.get("done_through"):
+        # Written before anything was done in order (older versions did that), nothing to skip
+        return None
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def update_catalog(root, replaced, encoder_name, catalog=None):
+    """Trage neue Pfade und Größen in den Katalog ein, falls das Archiv einen hat"""
+    from storage import CATALOG_FILE
+    catalog = catalog or os.path.join(root, CATALOG_FILE)
+    if not replaced or not os.path.exists(catalog):
+        return
+    import sqlite3
+    db = sqlite3.connect(catalog)
+    try:
+        # The dedup table only exists once the tool has run with dedup
+        has_dedup = db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dedup'").fetchone()
+        for old, new, size_bytes, digest in replaced:
+            old_rel, new_rel = os.path.relpath(old, root), os.path.relpath(new, root)
+            db.execute("UPDATE screenshots SET path = ?, size_bytes = ?, encoder = ?, hash = ? WHERE path = ?",
+                       (new_rel, size_bytes, encoder_name, digest, old_rel))
+            if has_dedup:
+                db.execute("UPDATE dedup SET path = ? WHERE path = ?", (new_rel, old_rel))
+        db.commit()
+    finally:
+        db.close()
+
+
+def reencode(root, encoder_name="png", profile="smallest", options=None, workers=None, checkpoint_path=None,
+             catalog=None):
+    """Kodiere ein Screenshot-Archiv neu; Speicher bleibt unabhängig von der Archivgröße begrenzt"""
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    workers = workers or os.cpu_count() or 1
+    checkpoint_path = checkpoint_path or os.path.join(root, CHECKPOINT_FILE)
+    job = {"encoder": encoder_name, "profile": profile, "options": options or {}}
+    checkpoint = load_checkpoint(checkpoint_path, job)
+    resume_after = tuple(tuple(part) for part in checkpoint["done_through"]) if checkpoint else None
+    totals = dict(checkpoint["totals"]) if checkpoint else {
+        "files": 0, REPLACED: 0, NOT_SMALLER: 0, NOT_LOSSLESS: 0, LINKED: 0, FAILED: 0,
+        "bytes_before": 0, "bytes_after": 0,
+    }
+    if resume_after:
+        logger.info(f"Resuming after {os.path.join(*(part for _, part in resume_after))}")
+
+    started = time.perf_counter()
+    processed = 0
+    order = deque()          # [key, result or None] in scan order, for the low-water mark
+    done_through = resume_after
+    replaced = []
+    since_checkpoint = 0
+
+    def finish(future):
+        nonlocal done_through, since_checkpoint
+        path, target, old_size, new_size, status, detail = future.result()
+        entry = in_flight.pop(future)
+        entry[1] = (status, old_size, new_size)
+        if status == REPLACED:
+            replaced.append((path, target, new_size, detail))
+        elif status == FAILED:
+            logger.error(f"Error re-encoding {path}: {detail}")
+        # Everything up to the oldest unfinished file is done. Only those files are counted,
+        # so the totals in a checkpoint match its done_through and resuming counts nothing twice
+        while order and order[0][1] is not None:
+            done_through, (done_status, done_old, done_new) = order.popleft()
+            totals["files"] += 1
+            totals[done_status] += 1
+            totals["bytes_before"] += done_old
+            totals["bytes_after"] += done_new
+        since_checkpoint += 1
+        if since_checkpoint >= CHECKPOINT_EVERY and done_through is not None:
+            # Catalog first: the checkpoint must never claim files whose catalog rows are stale
+            update_catalog(root, replaced, encoder_name, catalog)
+            replaced.clear()
+            save_checkpoint(checkpoint_path, {"job": job, "done_through": done_through, "totals": totals})
+            since_checkpoint = 0
+
+    in_flight = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path in scan(root):
+            key = order_key(root, path)
+            if resume_after is not None and key <= resume_after:
+                continue
+            # Bounded window: the scan only runs ahead of the pool by a few files
+            while len(in_flight) >= workers * IN_FLIGHT_PER_WORKER:
+                completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    finish(future)
+            entry = [key, None]
+            order.append(entry)
+            in_flight[pool.submit(reencode_file, path, encoder_name, profile, options)] = entry
+            processed += 1
+        for future in list(in_flight):
+            future.result()
+            finish(future)
+
+    update_catalog(root, replaced, encoder_name, catalog)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    seconds = time.perf_counter() - started
+    totals["seconds"] = seconds
+    totals["files_per_s"] = processed / seconds if seconds else 0.0
+    totals["bytes_saved"] = totals["bytes_before"] - totals["bytes_after"]
+    return totals
@@ -0,0 +1,159 @@
+import logging
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+
+from PIL import Image
+
+from pipeline import Frame
+
+logger = logging.getLogger("PySSUtil")
+
+
+class _Record:
+    __slots__ = ("offset", "length", "mode", "size", "captured_at", "monitor", "compressed")
+
+    def __init__(self, offset, length, mode, size, captured_at, monitor, compressed):
+        self.offset = offset
+        self.length = length
+        self.mode = mode
+        self.size = size
+        self.captured_at = captured_at
+        self.monitor = monitor
+        self.compressed = compressed
+
+
+class ReplayBuffer:
+    """Nimmt laufend Frames in einen vorab reservierten Ringpuffer auf"""
+
+    def __init__(self, grab_frame, fps=2, seconds=10, memory_mb=256, compress=False):
+        self.grab_frame = grab_frame
+        self.interval = 1.0 / max(0.1, fps)
+        self.max_frames = max(1, int(round(fps * seconds)))
+        self.compress = compress
+
+        # One arena for all frames: records are written back to back and wrap around,
+        # so steady-state capture never allocates frame storage again. It is sized on the
+        # first frame, to what max_frames of that size need, capped at memory_mb
+        self.memory_limit = int(memory_mb * 1024 * 1024)
+        self.capacity = 0
+        self.arena = None
+        self.records = deque()
+        self.write_pos = 0
+        self.skipped = 0
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._capture_loop, name="replay-buffer", daemon=True)
+        self.thread.start()
+        logger.info(f"Replay buffer started ({self.max_frames} frames, up to {self.memory_limit // (1024 * 1024)} MB)")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def _capture_loop(self):
+        next_tick = time.monotonic()
+        while not self.stop_event.is_set():
+            try:
+                image, monitor = self.grab_frame()
+                self.add(image, monitor)
+            except Exception as e:
+                logger.error(f"Error capturing replay frame: {e}")
+
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                # Grabbing is slower than the frame rate, don't try to catch up
+                next_tick = time.monotonic()
+                delay = 0
+            self.stop_event.wait(delay)
+
+    def _ensure_arena(self, frame_bytes):
+        needed = min(self.memory_limit, self.max_frames * frame_bytes)
+        if self.arena is None or needed > self.capacity:
+            # First frame, or the monitor grew: the old records are dropped with the old arena
+            self.arena = bytearray(needed)
+            self.capacity = needed
+            self.records.clear()
+            self.write_pos = 0
+
+    def add(self, image, monitor=None, captured_at=None):
+        """Lege ein Frame im Ringpuffer ab"""
+        if image.mode not in ("RGB", "RGBX"):
+            image = image.convert("RGB")
+        # Frames are kept as RGBX, Pillow's own pixel layout for RGB, so the grab is copied
+        # straight into the arena without a tobytes() copy in between
+        length = image.size[0] * image.size[1] * 4
+        if length > self.memory_limit:
+            self.skipped += 1
+            logger.warning(f"Replay frame ({length} bytes) exceeds replay_memory_mb, skipped")
+            return False
+
+        with self.lock:
+            self._ensure_arena(length)
+            offset = self.write_pos
+            wrapped = offset + length > self.capacity
+            if wrapped:
+                offset = 0
+            end = offset + length
+
+            # Free the oldest records until the new one fits and the frame limit is kept
+            while self.records:
+                oldest = self.records[0]
+                overlaps = oldest.offset < end and oldest.offset + oldest.length > offset
+                stale_tail = wrapped and oldest.offset >= self.write_pos
+                if overlaps or stale_tail or len(self.records) >= self.max_frames:
+                    self.records.popleft()
+                else:
+                    break
+
+            slot = memoryview(self.arena)[offset:end]
+            view = Image.frombuffer("RGBX", image.size, slot, "raw", "RGBX", 0, 1)
+            view.im.paste(image.im, (0, 0) + image.size)
+            del view
+            compressed = False
+            if self.compress:
+                packed = zlib.compress(slot, 1)
+                if len(packed) < length:
+                    # The packed frame is smaller, it overwrites the start of its own slot
+                    slot[:len(packed)] = packed
+                    end = offset + len(packed)
+                    compressed = True
+            slot.release()
+
+            self.records.append(_Record(
+                offset, end - offset, "RGBX", image.size,
+                captured_at or datetime.now(), monitor, compressed
+            ))
+            self.write_pos = end
+        return True
+
+    def snapshot(self, latest_only=False):
+        """Kopiere die gepufferten Frames heraus (älteste zuerst)"""
+        with self.lock:
+            records = [self.records[-1]] if latest_only and self.records else list(self.records)
+            if not records:
+                return []
+            chunks = [bytes(self.arena[r.offset:r.offset + r.length]) for r in records]
+
+        frames = []
+        for record, data in zip(records, chunks):
+            if record.compressed:
+                data = zlib.decompress(data)
+            image = Image.frombytes(record.mode, record.size, data).convert("RGB")
+            frames.append(Frame(image, record.captured_at, record.monitor))
+        return frames
+
+    def __len__(self):
+        return len(self.records)
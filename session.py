@@ -0,0 +1,107 @@
+import logging
+import sys
+import threading
+
+logger = logging.getLogger("PySSUtil")
+
+WM_QUIT = 0x0012
+WM_POWERBROADCAST = 0x0218
+WM_WTSSESSION_CHANGE = 0x02B1
+PBT_APMRESUMESUSPEND = 0x0007      # resumed because of user input, not by a wake timer
+WTS_CONSOLE_CONNECT = 0x1
+WTS_REMOTE_CONNECT = 0x3
+WTS_SESSION_UNLOCK = 0x8
+NOTIFY_FOR_THIS_SESSION = 0
+
+SESSION_EVENTS = {
+    WTS_CONSOLE_CONNECT: "console connected",
+    WTS_REMOTE_CONNECT: "remote session connected",
+    WTS_SESSION_UNLOCK: "session unlocked",
+}
+
+
+class SessionWatcher:
+    """Meldet Entsperren, Wiederverbinden und Aufwachen (Windows), ohne dafür zu pollen
+
+    Windows removes low-level hooks mostly around these events. The thread sits in
+    GetMessage on a hidden window and does not wake up while nothing happens. The window
+    is top-level, message-only windows get no WM_POWERBROADCAST.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.thread = None
+        self.thread_id = None
+
+    def start(self):
+        if sys.platform != "win32":
+            return
+        self.thread = threading.Thread(target=self._run, name="session-events", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread_id is None:
+            return
+        import ctypes
+        ctypes.windll.user32.PostThreadMessageW(self.thread_id, WM_QUIT, 0, 0)
+
+    def _notify(self, reason):
+        try:
+            self.callback(reason)
+        except Exception as e:
+            logger.error(f"Error handling session event ({reason}): {e}")
+
+    def _run(self):
+        import ctypes
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        wtsapi32 = ctypes.windll.wtsapi32
+
+        LRESULT = ctypes.c_ssize_t
+        WNDPROC = ctypes.WINFUNCTYPE(LRESULT, wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM)
+
+        class WNDCLASSW(ctypes.Structure):
+            _fields_ = [("style", wintypes.UINT), ("lpfnWndProc", WNDPROC),
+                        ("cbClsExtra", ctypes.c_int), ("cbWndExtra", ctypes.c_int),
+                        ("hInstance", wintypes.HINSTANCE), ("hIcon", wintypes.HICON),
+                        ("hCursor", wintypes.HANDLE), ("hbrBackground", wintypes.HBRUSH),
+                        ("lpszMenuName", wintypes.LPCWSTR), ("lpszClassName", wintypes.LPCWSTR)]
+
+        user32.DefWindowProcW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+        user32.DefWindowProcW.restype = LRESULT
+        user32.CreateWindowExW.argtypes = [wintypes.DWORD, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD,
+                                           ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                           wintypes.HWND, wintypes.HMENU, wintypes.HINSTANCE, wintypes.LPVOID]
+        user32.CreateWindowExW.restype = wintypes.HWND
+        user32.GetMessageW.argtypes = [ctypes.POINTER(wintypes.MSG), wintypes.HWND, wintypes.UINT, wintypes.UINT]
+
+        def window_proc(hwnd, message, wparam, lparam):
+            if message == WM_WTSSESSION_CHANGE and wparam in SESSION_EVENTS:
+                self._notify(SESSION_EVENTS[wparam])
+            elif message == WM_POWERBROADCAST and wparam == PBT_APMRESUMESUSPEND:
+                self._notify("resumed")
+            return user32.DefWindowProcW(hwnd, message, wparam, lparam)
+
+        # Kept on the instance, a collected callback would crash the message loop
+        self._window_proc = WNDPROC(window_proc)
+        window_class = WNDCLASSW()
+        window_class.lpfnWndProc = self._window_proc
+        window_class.lpszClassName = "PySSUtilSessionEvents"
+        if not user32.RegisterClassW(ctypes.byref(window_class)):
+            logger.warning("Could not register the session event window, hooks are only checked on other events")
+            return
+        hwnd = user32.CreateWindowExW(0, window_class.lpszClassName, None, 0, 0, 0, 0, 0,
+                                      None, None, None, None)
+        if not hwnd:
+            logger.warning("Could not create the session event window, hooks are only checked on other events")
+            return
+        if not wtsapi32.WTSRegisterSessionNotification(hwnd, NOTIFY_FOR_THIS_SESSION):
+            logger.warning("Could not subscribe to session changes, only resume events are reported")
+
+        self.thread_id = threading.get_native_id()
+        message = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(message), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(message))
+            user32.DispatchMessageW(ctypes.byref(message))
+        wtsapi32.WTSUnRegisterSessionNotification(hwnd)
+        user32.DestroyWindow(hwnd)
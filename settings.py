@@ -0,0 +1,150 @@
+import copy
+import json
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger("PySSUtil")
+
+POLL_INTERVAL = 2.0   # seconds between cheap stat() checks of the settings file
+WRITE_DELAY = 0.5     # seconds to collect several changes into one write
+
+
+class SettingsStore:
+    """Prozessweite Einstellungen: einmal geparst, aus dem Speicher gelesen, bei Änderungen neu geladen"""
+
+    def __init__(self, path, defaults, poll_interval=POLL_INTERVAL, write_delay=WRITE_DELAY):
+        self.path = path
+        self.defaults = defaults
+        self.poll_interval = poll_interval
+        self.write_delay = write_delay
+
+        self.data = copy.deepcopy(defaults)
+        self.subscribers = []
+        self.lock = threading.RLock()
+        self._file_state = None
+        self._write_timer = None
+        self._watch_thread = None
+        self._stop_event = threading.Event()
+
+        self.reloads = 0
+        self.writes = 0
+        self.load()
+
+    def load(self):
+        """Lies die Datei (fehlt sie, werden die Standardwerte geschrieben)"""
+        with self.lock:
+            state = None
+            try:
+                if os.path.exists(self.path):
+                    state = self._stat()
+                    with open(self.path, "r") as f:
+                        settings = json.load(f)
+                    self.data = {**copy.deepcopy(self.defaults), **settings}
+                    self._file_state = state
+                else:
+                    self.data = copy.deepcopy(self.defaults)
+                    self.save()
+            except Exception as e:
+                logger.error(f"Error loading settings: {e}")
+                if state is not None:
+                    # A broken file is only tried again once it is edited, not on every poll
+                    self._file_state = state
+            return self.data
+
+    def reload(self):
+        """Lade die Datei neu und benachrichtige über geänderte Schlüssel"""
+        with self.lock:
+            old = self.data
+            new = self.load()
+            changed = {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+            self.reloads += 1
+        if changed:
+            logger.info(f"Settings changed: {', '.join(sorted(changed))}")
+            for callback in list(self.subscribers):
+                try:
+                    callback(changed)
+                except Exception as e:
+                    logger.error(f"Error applying settings change: {e}")
+        return changed
+
+    def subscribe(self, callback):
+        """callback(changed_keys) wird nach jedem Neuladen mit Änderungen aufgerufen"""
+        self.subscribers.append(callback)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def update(self, values):
+        """Ändere Werte im Speicher und speichere verzögert"""
+        with self.lock:
+            self.data.update(values)
+        self.schedule_save()
+
+    def schedule_save(self):
+        """Fasse schnell aufeinanderfolgende Änderungen zu einem Schreibvorgang zusammen"""
+        with self.lock:
+            if self._write_timer is not None:
+                self._write_timer.cancel()
+            self._write_timer = threading.Timer(self.write_delay, self.save)
+            self._write_timer.daemon = True
+            self._write_timer.start()
+
+    def save(self):
+        """Schreibe die Einstellungen atomar (temporäre Datei + rename)"""
+        with self.lock:
+            self._write_timer = None
+            try:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                fd, tmp_path = tempfile.mkstemp(prefix=".settings_", suffix=".tmp", dir=directory)
+                try:
+                    with os.fdopen(fd, "w") as f:
+                        json.dump(self.data, f, indent=4)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_path, self.path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+                # Our own write must not look like an external edit
+                self._file_state = self._stat()
+                self.writes += 1
+                logger.info("Settings saved!")
+            except Exception as e:
+                logger.error(f"Error saving settings: {e}")
+
+    def flush(self):
+        """Schreibe eine noch ausstehende, verzögerte Speicherung sofort"""
+        with self.lock:
+            timer = self._write_timer
+            if timer is None:
+                return
+            timer.cancel()
+        self.save()
+
+    def start_watching(self):
+        if self._watch_thread is not None:
+            return
+        self._watch_thread = threading.Thread(target=self._watch_loop, name="settings-watch", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        self._stop_event.set()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _watch_loop(self):
+        while not self._stop_event.wait(self.poll_interval):
+            state = self._stat()
+            if state is not None and state != self._file_state:
+                logger.info(f"Settings file {self.path} changed on disk, reloading")
+                self.reload()
@@ -0,0 +1,295 @@
+import hashlib
+import itertools
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from dedup import DEDUP_EXACT, DedupIndex
+from output import DURABILITY_GROUP, AtomicWriter
+
+logger = logging.getLogger("PySSUtil")
+
+CATALOG_FILE = "catalog.sqlite3"
+SEQUENCE_MODULO = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS screenshots (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    captured_at REAL NOT NULL,
+    monitor TEXT,
+    monitor_x INTEGER,
+    monitor_y INTEGER,
+    width INTEGER,
+    height INTEGER,
+    encoder TEXT,
+    size_bytes INTEGER NOT NULL,
+    hash TEXT
+);
+CREATE INDEX IF NOT EXISTS screenshots_captured_at ON screenshots (captured_at);
+CREATE INDEX IF NOT EXISTS screenshots_monitor ON screenshots (monitor, captured_at);
+"""
+
+COLUMNS = ("id", "path", "captured_at", "monitor", "monitor_x", "monitor_y",
+           "width", "height", "encoder", "size_bytes", "hash")
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+class ScreenshotStore:
+    """Nach Datum aufgeteilte Ablage mit SQLite-Katalog der Metadaten"""
+
+    def __init__(self, root, retention_days=0, retention_max_mb=0,
+                 dedup=DEDUP_EXACT, dedup_threshold=4, dedup_index_size=4096,
+                 durability=DURABILITY_GROUP, group_files=16, group_ms=200, spool_path=None, spool_slow_ms=1000,
+                 catalog_dir=None):
+        # Absolute once here, so logging a saved path does not resolve the working directory per shot
+        self.root = os.path.abspath(root)
+        self.retention_days = retention_days
+        self.retention_max_mb = retention_max_mb
+        self.sequence = itertools.count(1)
+        self.lock = threading.Lock()
+        self.writer = AtomicWriter(durability, group_files, group_ms, spool_path, spool_slow_ms)
+
+        try:
+            os.makedirs(self.root, exist_ok=True)
+        except OSError as e:
+            if not catalog_dir:
+                raise
+            # The writer spools until the target answers again
+            logger.warning(f"Screenshot folder {self.root} is not reachable: {e}")
+        # Every shot commits to the catalog: on a network share that would block each save
+        # (and WAL does not work there), so it can live on a local disk instead
+        catalog = os.path.join(catalog_dir or self.root, CATALOG_FILE)
+        if catalog_dir:
+            os.makedirs(catalog_dir, exist_ok=True)
+            self.adopt_catalog(catalog)
+        self.db = sqlite3.connect(catalog, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM screenshots").fetchone()[0]
+        self.pruned_on = None
+        self.dedup = DedupIndex(self.db, self.lock, dedup, dedup_threshold, dedup_index_size)
+
+    def adopt_catalog(self, catalog):
+        """Übernimm beim ersten Start mit verlegtem Katalog den bisherigen aus dem Screenshot-Ordner"""
+        old = os.path.join(self.root, CATALOG_FILE)
+        if os.path.exists(catalog) or os.path.abspath(old) == os.path.abspath(catalog) or not os.path.exists(old):
+            return
+        try:
+            # The backup API also picks up what is still in the old catalog's WAL
+            source = sqlite3.connect(old)
+            target = sqlite3.connect(catalog)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            logger.info(f"Catalog moved from {old} to {catalog}")
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Error taking over the catalog from {old}, starting a new one: {e}")
+
+    def close(self):
+        # Pending group commits land before the catalog goes away
+        self.writer.close()
+        with self.lock:
+            self.db.close()
+
+    def path_for(self, frame, extension):
+        """Kollisionsfreier Pfad: Datums-Shard, Zeitstempel in Mikrosekunden und Laufnummer"""
+        captured_at = frame.captured_at
+        shard = os.path.join(self.root, captured_at.strftime("%Y"), captured_at.strftime("%m"), captured_at.strftime("%d"))
+        sequence = next(self.sequence) % SEQUENCE_MODULO
+        stem = f"{frame.name or 'screenshot'}_{captured_at.strftime('%Y-%m-%d_%H-%M-%S-%f')}_{sequence:04d}"
+        return shard, os.path.join(shard, f"{stem}{extension}")
+
+    def ensure_dir(self, directory):
+        self.writer.ensure_dir(directory)
+
+    def save(self, frame, data, encoder, extension, fingerprint=None):
+        """Schreibe die kodierten Bytes und trage sie in den Katalog ein"""
+        _, path = self.path_for(frame, extension)
+        self.writer.write(path, data)
+        self.record(frame, path, len(data), encoder, hashlib.blake2b(data, digest_size=16).hexdigest(), fingerprint)
+        return path
+
+    def find_duplicate(self, frame):
+        """(Fingerprint, Pfad einer schon gespeicherten gleichen Datei oder None)"""
+        if not self.dedup.enabled or frame.image is None:
+            return None, None
+        fingerprint = self.dedup.fingerprint(frame.image)
+        existing = self.dedup.lookup(fingerprint)
+        if existing is None:
+            return fingerprint, None
+        path = os.path.join(self.root, existing)
+        if not os.path.exists(path):
+            if self.writer.in_flight(path):
+                # Not committed or still spooled, encoding once more is cheaper than waiting
+                return fingerprint, None
+            # Deleted outside of the retention rules
+            self.dedup.forget([existing])
+            return fingerprint, None
+        return fingerprint, path
+
+    def save_duplicate(self, frame, existing):
+        """Lege statt einer neu kodierten Datei einen Hardlink auf die vorhandene an (None, wenn sie weg ist)"""
+        shard, path = self.path_for(frame, os.path.splitext(existing)[1])
+        self.ensure_dir(shard)
+        try:
+            os.link(existing, path)
+            linked = True
+        except FileNotFoundError:
+            linked = None
+        except OSError:
+            # No hardlinks on this file system, the encode is still saved
+            linked = False
+            try:
+                with open(existing, "rb") as src, self.writer.open(path) as dst:
+                    shutil.copyfileobj(src, dst)
+            except FileNotFoundError:
+                linked = None
+        if linked is None:
+            # Pruned since find_duplicate, the caller encodes the frame instead
+            self.dedup.forget([os.path.relpath(existing, self.root)])
+            return None
+        with self.lock:
+            row = self.db.execute(
+                "SELECT encoder, size_bytes, hash FROM screenshots WHERE path = ?",
+                (os.path.relpath(existing, self.root),)
+            ).fetchone()
+        encoder, size_bytes, digest = row if row else (None, os.path.getsize(path), None)
+        # A link takes no extra space, the shared file is counted once (see prune)
+        self.record(frame, path, size_bytes if not linked else 0, encoder, digest)
+        return path
+
+    def record(self, frame, path, size_bytes, encoder, digest, fingerprint=None, dimensions=None):
+        monitor = frame.monitor or {}
+        # Frames written in strips never hold the whole image
+        width, height = dimensions or (frame.image.size if frame.image is not None else (None, None))
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO screenshots "
+                "(path, captured_at, monitor, monitor_x, monitor_y, width, height, encoder, size_bytes, hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (os.path.relpath(path, self.root), frame.captured_at.timestamp(), monitor.get("name"),
+                 monitor.get("x"), monitor.get("y"), width, height, encoder, size_bytes, digest)
+            )
+            if fingerprint is not None:
+                self.dedup.add(fingerprint, os.path.relpath(path, self.root))
+            self.db.commit()
+            self.total_bytes += size_bytes
+        self.enforce_retention()
+
+    def find(self, start=None, end=None, monitor=None, limit=None):
+        """Suche Screenshots nach Zeitraum und Monitor (über den Index, ohne Verzeichnis-Scan)"""
+        query = f"SELECT {', '.join(COLUMNS)} FROM screenshots WHERE 1=1"
+        params = []
+        if start is not None:
+            query += " AND captured_at >= ?"
+            params.append(_timestamp(start))
+        if end is not None:
+            query += " AND captured_at < ?"
+            params.append(_timestamp(end))
+        if monitor is not None:
+            query += " AND monitor = ?"
+            params.append(monitor)
+        query += " ORDER BY captured_at"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        with self.lock:
+            rows = self.db.execute(query, params).fetchall()
+        results = []
+        for row in rows:
+            entry = dict(zip(COLUMNS, row))
+            entry["path"] = os.path.join(self.root, entry["path"])
+            entry["captured_at"] = datetime.fromtimestamp(entry["captured_at"]).isoformat()
+            results.append(entry)
+        return results
+
+    def enforce_retention(self):
+        """Prüfe die Aufbewahrungsregeln (Alter höchstens einmal pro Tag)"""
+        today = datetime.now().date()
+        if self.retention_days and self.pruned_on != today:
+            self.pruned_on = today
+            self.prune(max_age_days=self.retention_days)
+        # Deleting a file that is still hardlinked frees nothing, so keep going until under the limit
+        while self.retention_max_mb and self.total_bytes > self.retention_max_mb * 1024 * 1024:
+            if not self.prune(max_total_mb=self.retention_max_mb):
+                break
+
+    def prune(self, max_age_days=0, max_total_mb=0):
+        """Lösche die ältesten Screenshots nach Alter oder Gesamtgröße"""
+        doomed = []
+        with self.lock:
+            if max_age_days:
+                cutoff = time.time() - max_age_days * 24 * 60 * 60
+                doomed += self.db.execute(
+                    "SELECT id, path, size_bytes, hash FROM screenshots WHERE captured_at < ?", (cutoff,)
+                ).fetchall()
+            if max_total_mb:
+                excess = self.total_bytes - sum(row[2] for row in doomed) - max_total_mb * 1024 * 1024
+                seen = {row[0] for row in doomed}
+                for row in self.db.execute("SELECT id, path, size_bytes, hash FROM screenshots ORDER BY captured_at"):
+                    if excess <= 0:
+                        break
+                    if row[0] not in seen:
+                        doomed.append(row)
+                        excess -= row[2]
+            if not doomed:
+                return 0
+            self.db.executemany("DELETE FROM screenshots WHERE id = ?", [(row[0],) for row in doomed])
+            freed = 0
+            for _, _, size_bytes, digest in doomed:
+                # Hardlinked duplicates are recorded with 0 bytes: if one of them survives,
+                # the file stays on disk and its size moves over to that link
+                heir = None
+                if size_bytes and digest:
+                    heir = self.db.execute(
+                        "SELECT id FROM screenshots WHERE hash = ? AND size_bytes = 0 ORDER BY captured_at LIMIT 1",
+                        (digest,)
+                    ).fetchone()
+                if heir is None:
+                    freed += size_bytes
+                else:
+                    self.db.execute("UPDATE screenshots SET size_bytes = ? WHERE id = ?", (size_bytes, heir[0]))
+            self.db.commit()
+            self.total_bytes -= freed
+
+        self.dedup.forget(path for _, path, _, _ in doomed)
+        files = set()
+        for _, path, _, _ in doomed:
+            segment, separator, _ = path.rpartition("#")
+            if not separator:
+                files.add(path)
+                continue
+            # A delta segment goes once none of its frames is left in the catalog
+            with self.lock:
+                prefix = segment + "#"
+                remaining = self.db.execute(
+                    "SELECT 1 FROM screenshots WHERE substr(path, 1, ?) = ? LIMIT 1", (len(prefix), prefix)
+                ).fetchone()
+            if remaining is None:
+                files.add(segment)
+        for path in files:
+            try:
+                os.remove(os.path.join(self.root, path))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"Error deleting {path}: {e}")
+        logger.info(f"Retention removed {len(doomed)} screenshot(s)")
+        return len(doomed)
@@ -0,0 +1,178 @@
+import hashlib
+import logging
+import struct
+import sys
+import threading
+import zlib
+
+logger = logging.getLogger("PySSUtil")
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+IDAT_SIZE = 256 * 1024          # bytes of compressed data per IDAT chunk
+ZLIB_OVERHEAD = 512 * 1024      # deflate window and state per running encoder, roughly
+MIN_STRIP_ROWS = 16
+PROFILE_LEVELS = {"fastest": 1, "balanced": 6, "smallest": 9}
+
+
+class MemoryBudget:
+    """Begrenzt den Speicher aller laufenden Strip-Aufnahmen zusammen"""
+
+    def __init__(self, limit_bytes):
+        self.limit = max(1, int(limit_bytes))
+        self.used = 0
+        self.peak = 0
+        self.waits = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, size):
+        # A single capture bigger than the budget still runs, just alone
+        size = min(size, self.limit)
+        with self.condition:
+            if self.used + size > self.limit:
+                self.waits += 1
+            self.condition.wait_for(lambda: self.used + size <= self.limit)
+            self.used += size
+            self.peak = max(self.peak, self.used)
+        return size
+
+    def release(self, size):
+        with self.condition:
+            self.used -= size
+            self.condition.notify_all()
+
+    def stats(self):
+        return {"limit": self.limit, "used": self.used, "peak": self.peak, "waits": self.waits}
+
+
+class BufferPool:
+    """Hält Zeilenpuffer zwischen Aufnahmen vor, statt sie jedes Mal neu anzulegen"""
+
+    def __init__(self):
+        self.free = []
+        self.lock = threading.Lock()
+        self.allocated = 0
+
+    def get(self, size):
+        with self.lock:
+            for index, buffer in enumerate(self.free):
+                if len(buffer) >= size:
+                    return self.free.pop(index)
+        self.allocated += 1
+        return bytearray(size)
+
+    def put(self, buffer):
+        with self.lock:
+            self.free.append(buffer)
+
+
+class StreamingPNGWriter:
+    """PNG-Encoder, der Zeilen streifenweise annimmt und IDAT-Chunks sofort schreibt"""
+
+    def __init__(self, fp, width, height, level=6):
+        self.fp = fp
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.digest = hashlib.blake2b(digest_size=16)
+        self.compressor = zlib.compressobj(level)
+        self.pending = []
+        self.pending_size = 0
+        self._write(PNG_SIGNATURE)
+        # 8 bit RGB, no interlace
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def write_strip(self, raw, rows, buffer):
+        """Hänge rows Zeilen roher RGB-Pixel an; buffer wird für die Filterbytes wiederverwendet"""
+        stride = self.width * 3
+        line = stride + 1
+        view = memoryview(buffer)
+        for row in range(rows):
+            # Filter type 0 (None): every other filter needs per-byte arithmetic in Python
+            view[row * line] = 0
+            view[row * line + 1:(row + 1) * line] = raw[row * stride:(row + 1) * stride]
+        self._compressed(self.compressor.compress(view[:rows * line]))
+        self.rows_written += rows
+
+    def close(self):
+        if self.rows_written != self.height:
+            raise ValueError(f"PNG has {self.height} rows, got {self.rows_written}")
+        self._compressed(self.compressor.flush())
+        self._flush_idat()
+        self._chunk(b"IEND", b"")
+
+    def _compressed(self, data):
+        if not data:
+            return
+        self.pending.append(data)
+        self.pending_size += len(data)
+        if self.pending_size >= IDAT_SIZE:
+            self._flush_idat()
+
+    def _flush_idat(self):
+        if self.pending_size:
+            self._chunk(b"IDAT", b"".join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+
+    def _chunk(self, kind, data):
+        self._write(struct.pack(">I", len(data)) + kind)
+        self._write(data)
+        self._write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF))
+
+    def _write(self, data):
+        self.fp.write(data)
+        self.digest.update(data)
+        self.bytes_written += len(data)
+
+
+def strip_plan(width, height, budget_bytes, grab_bytes_per_pixel=4):
+    """Zeilen pro Streifen und geschätzter Speicherbedarf einer Aufnahme"""
+    # Per row: what the backend allocates for the grab (Pillow keeps RGB at 4 bytes per pixel,
+    # plus the backend's own buffer), its tobytes() copy and the filtered copy handed to zlib
+    per_row = width * (grab_bytes_per_pixel + 3 + 3) + 1
+    rows = max(MIN_STRIP_ROWS, min(height, (budget_bytes - ZLIB_OVERHEAD) // per_row))
+    return rows, rows * per_row + ZLIB_OVERHEAD
+
+
+def capture_strips(grab, bbox, fp, budget, pool, level=6, strip_rows=None, grab_bytes_per_pixel=4):
+    """Grabbe bbox streifenweise und schreibe sie direkt als PNG; liefert den Writer
+
+    grab must read only the box it is given (CaptureBackend.grab_region with region_grab),
+    otherwise every strip costs a grab of the whole desktop.
+    """
+    left, top, right, bottom = bbox
+    width, height = right - left, bottom - top
+    rows, cost = strip_plan(width, height, budget.limit, grab_bytes_per_pixel)
+    if strip_rows:
+        rows, cost = strip_rows, strip_rows * (width * (grab_bytes_per_pixel + 3 + 3) + 1) + ZLIB_OVERHEAD
+    reserved = budget.acquire(cost)
+    buffer = pool.get(rows * (width * 3 + 1))
+    try:
+        writer = StreamingPNGWriter(fp, width, height, level)
+        for y in range(top, bottom, rows):
+            strip_height = min(rows, bottom - y)
+            strip = grab((left, y, right, y + strip_height))
+            if strip.mode != "RGB":
+                strip = strip.convert("RGB")
+            writer.write_strip(strip.tobytes(), strip_height, buffer)
+            del strip
+        writer.close()
+        return writer
+    finally:
+        pool.put(buffer)
+        budget.release(reserved)
+
+
+def peak_rss_mb():
+    """Höchster Speicherverbrauch des Prozesses bisher (None, wenn unbekannt)"""
+    try:
+        if sys.platform == "win32":
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except Exception:
+        return None
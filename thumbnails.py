@@ -0,0 +1,217 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image
+
+logger = logging.getLogger("PySSUtil")
+
+THUMBNAIL_DIR = ".thumbnails"
+THUMBNAIL_EXTENSION = ".jpg"
+THUMBNAIL_QUALITY = 80
+IMAGE_EXTENSIONS = (".png", ".webp", ".jpg", ".jpeg", ".qoi", ".bmp")
+SKIP_DIRS = (THUMBNAIL_DIR, ".spill")
+QUEUE_SIZE = 16  # frames waiting for a thumbnail, full frames are large
+IN_FLIGHT_PER_WORKER = 2  # backfill jobs submitted ahead per pool worker
+
+
+def render_thumbnail(image, size):
+    """Verkleinere ein Bild: erst reduce() um ganze Faktoren, dann das feine Resampling"""
+    factor = min(image.size[0] // size, image.size[1] // size)
+    if factor > 1:
+        # Box reduction by an integer factor is much cheaper than resampling the full frame
+        image = image.reduce(factor)
+    else:
+        image = image.copy()
+    image.thumbnail((size, size), reducing_gap=2.0)
+    return image if image.mode == "RGB" else image.convert("RGB")
+
+
+def write_thumbnail(image, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    image.save(tmp_path, "JPEG", quality=THUMBNAIL_QUALITY)
+    os.replace(tmp_path, path)
+
+
+def thumbnail_file(source, target, size):
+    """Erzeuge ein Thumbnail aus einer Datei (läuft im Prozess-Pool des Backfills)"""
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+        return 0
+    with Image.open(source) as image:
+        # Lets JPEG decode at 1/2, 1/4 or 1/8 scale, other formats ignore it
+        image.draft("RGB", (size, size))
+        write_thumbnail(render_thumbnail(image, size), target)
+    return os.path.getsize(target)
+
+
+class ThumbnailCache:
+    """Sidecar-Cache mit Thumbnails, im Hintergrund erzeugt und per LRU nach Größe begrenzt"""
+
+    def __init__(self, root, size=256, max_mb=256, background=True):
+        self.root = root
+        self.path = os.path.join(root, THUMBNAIL_DIR)
+        self.size = size
+        self.max_bytes = max_mb * 1024 * 1024
+        self.entries = OrderedDict()  # relative path -> bytes, least recently used first
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.scan()
+        self.thread = None
+        if background:
+            self.thread = threading.Thread(target=self._worker_loop, name="thumbnails", daemon=True)
+            self.thread.start()
+
+    def scan(self):
+        """Lies den vorhandenen Cache ein, älteste Zugriffe zuerst"""
+        found = []
+        for dirpath, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                if not filename.endswith(THUMBNAIL_EXTENSION):
+                    continue
+                full = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(full)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, os.path.relpath(full, self.path), stat.st_size))
+        found.sort()
+        with self.lock:
+            self.entries = OrderedDict((name, size) for _, name, size in found)
+            self.total_bytes = sum(self.entries.values())
+        self.evict()
+
+    def target_for(self, screenshot_path):
+        try:
+            relative = os.path.relpath(screenshot_path, self.root)
+        except ValueError:
+            # Other drive on Windows
+            relative = os.pardir
+        parts = relative.split(os.sep)
+        if parts[0] in (os.pardir, THUMBNAIL_DIR) or os.path.isabs(relative):
+            # Paths come in over IPC too, nothing outside the archive may be read or written (and later evicted)
+            raise ValueError(f"{screenshot_path} is not a screenshot in {self.root}")
+        return os.path.join(self.path, os.path.splitext(relative)[0] + THUMBNAIL_EXTENSION)
+
+    def submit(self, image, screenshot_path):
+        """Reihe ein noch dekodiertes Frame ein; bei voller Queue wird es übersprungen"""
+        try:
+            self.queue.put_nowait((image, screenshot_path))
+        except queue.Full:
+            # Best effort, the backfill command fills the gaps
+            self.dropped += 1
+
+    def get(self, screenshot_path):
+        """Pfad des Thumbnails (wird bei Bedarf aus der Datei erzeugt)"""
+        target = self.target_for(screenshot_path)
+        if not os.path.exists(target):
+            self.add(target, thumbnail_file(screenshot_path, target, self.size))
+            return target
+        name = os.path.relpath(target, self.path)
+        with self.lock:
+            if name in self.entries:
+                self.entries.move_to_end(name)
+        # The mtime is the access time for the LRU order after a restart
+        os.utime(target)
+        return target
+
+    def add(self, target, size_bytes):
+        name = os.path.relpath(target, self.path)
+        with self.lock:
+            self.total_bytes += size_bytes - self.entries.pop(name, 0)
+            self.entries[name] = size_bytes
+        self.evict()
+
+    def evict(self):
+        doomed = []
+        with self.lock:
+            while self.max_bytes and self.total_bytes > self.max_bytes and self.entries:
+                name, size_bytes = self.entries.popitem(last=False)
+                self.total_bytes -= size_bytes
+                doomed.append(name)
+        for name in doomed:
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self):
+        return {"entries": len(self.entries), "bytes": self.total_bytes, "dropped": self.dropped}
+
+    def _worker_loop(self):
+        while True:
+            image, screenshot_path = self.queue.get()
+            try:
+                target = self.target_for(screenshot_path)
+                write_thumbnail(render_thumbnail(image, self.size), target)
+                self.add(target, os.path.getsize(target))
+            except Exception as e:
+                logger.error(f"Error creating thumbnail for {screenshot_path}: {e}")
+            finally:
+                self.queue.task_done()
+
+
+def backfill(root, size=256, max_mb=256, workers=None):
+    """Erzeuge fehlende Thumbnails für ein vorhandenes Archiv mit einem Prozess-Pool"""
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    workers = workers or os.cpu_count() or 1
+    cache_path = os.path.join(root, THUMBNAIL_DIR)
+
+    def jobs():
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [name for name in dirnames if name not in SKIP_DIRS]
+            for filename in filenames:
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    source = os.path.join(dirpath, filename)
+                    relative = os.path.splitext(os.path.relpath(source, root))[0] + THUMBNAIL_EXTENSION
+                    yield source, os.path.join(cache_path, relative)
+
+    started = time.perf_counter()
+    images = created = failed = 0
+
+    def finish(future):
+        nonlocal created, failed
+        source = in_flight.pop(future)
+        try:
+            if future.result():
+                created += 1
+        except Exception as e:
+            failed += 1
+            logger.error(f"Error creating thumbnail for {source}: {e}")
+
+    in_flight = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for source, target in jobs():
+            # Bounded window: memory stays flat however large the archive is
+            while len(in_flight) >= workers * IN_FLIGHT_PER_WORKER:
+                completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    finish(future)
+            in_flight[pool.submit(thumbnail_file, source, target, size)] = source
+            images += 1
+        for future in list(in_flight):
+            finish(future)
+
+    # Scanning the cache applies the size limit to the new thumbnails too
+    cache = ThumbnailCache(root, size, max_mb, background=False)
+    return {
+        "images": images,
+        "created": created,
+        "failed": failed,
+        "seconds": time.perf_counter() - started,
+        "cache_bytes": cache.total_bytes,
+    }
@@ -0,0 +1,120 @@
+import logging
+import sys
+import threading
+import time
+
+logger = logging.getLogger("PySSUtil")
+
+
+def idle_seconds():
+    """Sekunden seit der letzten Eingabe (None, wenn das System es nicht verrät)"""
+    if sys.platform != "win32":
+        return None
+    import ctypes
+    from ctypes import wintypes
+
+    class LASTINPUTINFO(ctypes.Structure):
+        _fields_ = [("cbSize", wintypes.UINT), ("dwTime", wintypes.DWORD)]
+
+    info = LASTINPUTINFO()
+    info.cbSize = ctypes.sizeof(info)
+    if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+        return None
+    # Both tick counts wrap after ~49 days, the masked difference stays correct
+    return ((ctypes.windll.kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000.0
+
+
+def session_locked():
+    """True, wenn der Bildschirm gesperrt ist (Windows: Eingabe-Desktop nicht erreichbar)"""
+    if sys.platform != "win32":
+        return False
+    import ctypes
+    DESKTOP_SWITCHDESKTOP = 0x0100
+    desktop = ctypes.windll.user32.OpenInputDesktop(0, False, DESKTOP_SWITCHDESKTOP)
+    if not desktop:
+        return True
+    ctypes.windll.user32.CloseDesktop(desktop)
+    return False
+
+
+class IntervalScheduler:
+    """Ruft callback alle interval Sekunden auf, auf der monotonen Uhr und ohne Drift
+
+    Ticks sit on a fixed grid (start + n * interval), so a slow capture does not push the
+    following ones back. Ticks that are already over when the previous capture finishes are
+    skipped instead of being run back to back.
+    """
+
+    def __init__(self, callback, interval, idle_pause=0, idle_probe=idle_seconds, lock_probe=session_locked):
+        self.callback = callback
+        self.interval = max(0.1, float(interval))
+        self.idle_pause = idle_pause
+        self.idle_probe = idle_probe
+        self.lock_probe = lock_probe
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.ticks = 0
+        self.captured = 0
+        self.skipped = 0
+        self.paused = 0
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name="timelapse", daemon=True)
+        self.thread.start()
+        logger.info(f"Timelapse started, one shot every {self.interval:g}s")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+        logger.info(f"Timelapse stopped: {self.stats()}")
+
+    def should_pause(self):
+        try:
+            if self.lock_probe is not None and self.lock_probe():
+                return True
+            if self.idle_pause and self.idle_probe is not None:
+                idle = self.idle_probe()
+                return idle is not None and idle >= self.idle_pause
+        except Exception as e:
+            logger.error(f"Error checking for idle: {e}")
+        return False
+
+    def _loop(self):
+        next_tick = time.monotonic()
+        while not self.stop_event.wait(max(0.0, next_tick - time.monotonic())):
+            self.ticks += 1
+            if self.should_pause():
+                self.paused += 1
+            else:
+                try:
+                    self.callback()
+                    self.captured += 1
+                except Exception as e:
+                    logger.error(f"Error taking timelapse screenshot: {e}")
+
+            next_tick += self.interval
+            behind = time.monotonic() - next_tick
+            if behind > 0:
+                # Jump to the next tick that is still ahead, dropping the ones we missed
+                missed = int(behind // self.interval) + 1
+                self.skipped += missed
+                next_tick += missed * self.interval
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "ticks": self.ticks,
+            "captured": self.captured,
+            "skipped": self.skipped,
+            "paused": self.paused,
+        }
@@ -0,0 +1,100 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger("PySSUtil")
+
+POLICY_ONCE = "once"    # one capture per burst of presses
+POLICY_EACH = "each"    # one capture per (debounced) press
+POLICY_RATE = "rate"    # captures at a fixed rate while presses keep coming
+POLICIES = (POLICY_ONCE, POLICY_EACH, POLICY_RATE)
+
+
+class TriggerScheduler:
+    """Sitzt zwischen Hotkey-Callback und Aufnahme: entprellt, fasst zusammen und begrenzt"""
+
+    def __init__(self, callback, policy=POLICY_ONCE, debounce=0.15, window=0.5, rate=2.0, max_in_flight=2):
+        if policy not in POLICIES:
+            logger.warning(f"Unknown trigger policy '{policy}', using '{POLICY_ONCE}'")
+            policy = POLICY_ONCE
+        self.callback = callback
+        self.policy = policy
+        self.debounce = debounce          # each: presses closer than this are one press (bounce, auto-repeat)
+        self.window = window              # a gap longer than this ends a burst
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.max_in_flight = max(1, max_in_flight)
+
+        self.lock = threading.Lock()
+        self.last_press = None
+        self.last_fire = None
+        self.in_flight = 0
+        self.trailing = None
+
+        self.triggers = 0
+        self.fired = 0
+        self.merged = 0
+        self.dropped = 0
+
+    def trigger(self):
+        """Vom Hotkey-Thread aufgerufen, kehrt sofort zurück"""
+        now = time.monotonic()
+        with self.lock:
+            self.triggers += 1
+            gap = None if self.last_press is None else now - self.last_press
+            self.last_press = now
+
+            if self.policy == POLICY_EACH and gap is not None and gap < self.debounce:
+                self.merged += 1
+                return
+            if self.policy == POLICY_ONCE and gap is not None and gap < self.window:
+                self.merged += 1
+                return
+            if self.policy == POLICY_RATE and self.last_fire is not None and now - self.last_fire < self.interval:
+                # Held key: one trailing capture at the next slot stands in for all presses until then
+                self.merged += 1
+                if self.trailing is None:
+                    self.trailing = threading.Timer(self.last_fire + self.interval - now, self._fire_trailing)
+                    self.trailing.daemon = True
+                    self.trailing.start()
+                return
+            self._fire_locked(now)
+
+    def _fire_trailing(self):
+        with self.lock:
+            self.trailing = None
+            self._fire_locked(time.monotonic())
+
+    def _fire_locked(self, now):
+        if self.in_flight >= self.max_in_flight:
+            self.dropped += 1
+            logger.warning(f"{self.in_flight} capture(s) still running, trigger dropped")
+            return
+        self.in_flight += 1
+        self.fired += 1
+        self.last_fire = now
+        threading.Thread(target=self._run, name="capture-trigger", daemon=True).start()
+
+    def _run(self):
+        try:
+            self.callback()
+        except Exception as e:
+            logger.error(f"Error running triggered capture: {e}")
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def stop(self):
+        with self.lock:
+            if self.trailing is not None:
+                self.trailing.cancel()
+                self.trailing = None
+
+    def stats(self):
+        return {
+            "policy": self.policy,
+            "triggers": self.triggers,
+            "fired": self.fired,
+            "merged": self.merged,
+            "dropped": self.dropped,
+            "in_flight": self.in_flight,
+        }